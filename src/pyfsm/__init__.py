@@ -15,11 +15,68 @@
 from __future__ import annotations
 from typing import Any, Dict, List
 
+import importlib
+
+from .__about__ import __version__
+
 from .fsm_objects import (
     StateType, State,
-    Event, Transition
+    Event, Transition, Guard
 )
 
-from .fsm import FSM, FSMError
+from .fsm import FSM, FSMError, DecisionList
+from .fsm_nfa import NFSM, DFAState, EPSILON
+from .fsm_history import History, TraceRecorder
+from .fsm_planner import Planner
+from .fsm_analysis import FSMAnalyzer, AnalysisReport
+
+
+# ----- globals
+# these modules depend on yaml, sqlite3, multiprocessing, ... and are only
+# imported the first time one of their names is used
+_LAZY_IMPORTS: Dict[str, str] = {
+    'FSMBuilder': 'fsm_builder',
+    'FSMBuilderComposite': 'fsm_builder',
+    'FSMBuilderError': 'fsm_builder',
+    'ActionExecutor': 'fsm_executor',
+    'ActionQueue': 'fsm_executor',
+    'ActionResult': 'fsm_executor',
+    'StateStore': 'fsm_store',
+    'FSMPool': 'fsm_pool',
+    'Replay': 'fsm_replay',
+    'Replayer': 'fsm_replay',
+    'ReplayReport': 'fsm_replay',
+}
+
+__all__ = [
+    '__version__',
+    'StateType', 'State', 'Event', 'Transition', 'Guard',
+    'FSM', 'FSMError', 'DecisionList',
+    'NFSM', 'DFAState', 'EPSILON',
+    'History', 'TraceRecorder',
+    'Planner',
+    'FSMAnalyzer', 'AnalysisReport',
+] + list(_LAZY_IMPORTS)
+
+
+# ----- functions
+def __getattr__(name: str) -> Any:
+    """Import the lazy modules on first access
+
+    Args:
+        name : the name of the attribute
+
+    Returns:
+        The attribute from its module
+    """
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{_LAZY_IMPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
 
-from .fsm_builder import FSMBuilder, FSMBuilderComposite, FSMBuilderError
\ No newline at end of file
+def __dir__() -> List[str]:
+    """List the attributes of the module, including the lazy ones"""
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
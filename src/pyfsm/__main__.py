@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Command line entry point
+
+# ----- imports
+from __future__ import annotations
+from typing import List, Optional
+
+import sys
+import json
+import argparse
+
+from .fsm import FSMError
+from .fsm_builder import FSMBuilderError
+from .fsm_replay import Replay, FORMATS
+
+
+# ----- functions
+def _replay(args: argparse.Namespace) -> int:
+    """Run the replay command
+
+    Args:
+        args : the command line arguments
+
+    Returns:
+        The exit code
+    """
+    replay = Replay(args.definition, chunk_size=args.chunk_size, jobs=args.jobs)
+    report = replay.run(args.log, args.format, args.key_field, args.event_field)
+
+    if args.json:
+        print(json.dumps(report.toDict(), indent=2))
+        return 0
+
+    print(f"events     : {report.events}")
+    print(f"errors     : {report.errors}")
+    print(f"unknown    : {report.unknown}")
+    print(f"bad        : {report.bad}")
+    print(f"instances  : {report.instances}")
+    print(f"elapsed    : {report.elapsed:.3f}s")
+    print(f"events/sec : {report.rate:.0f}")
+    print("final states:")
+    for name, count in sorted(report.states.items(), key=lambda item: -item[1]):
+        print(f"  {name or '<none>'}: {count}")
+
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point
+
+    Args:
+        argv : the command line arguments (sys.argv if None)
+
+    Returns:
+        The exit code
+    """
+    parser = argparse.ArgumentParser(prog="python -m pyfsm", description="pyfsm command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser("replay", help="replay an event log through a FSM definition")
+    replay.add_argument("definition", help="the YAML definition file")
+    replay.add_argument("log", help="the event log (CSV, JSON lines or binary)")
+    replay.add_argument("--format", choices=FORMATS, default=None, help="format of the log (default: from the extension)")
+    replay.add_argument("--jobs", type=int, default=1, help="number of processes, partitioned by instance key")
+    replay.add_argument("--chunk-size", type=int, default=65536, help="number of records read at once")
+    replay.add_argument("--key-field", default="key", help="instance key field (JSON lines, CSV header)")
+    replay.add_argument("--event-field", default="event", help="event field (JSON lines, CSV header)")
+    replay.add_argument("--json", action="store_true", help="print the report as JSON")
+    replay.set_defaults(handler=_replay)
+
+    args = parser.parse_args(argv)
+
+    try:
+        return args.handler(args)
+    except (FSMError, FSMBuilderError, OSError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,14 +13,17 @@
 
 # ----- imports
 from __future__ import annotations
-from typing import Any, Dict, List, Callable, Optional
+from typing import Any, Dict, List, Callable, Optional, Tuple
 
+import copy
+import time
 import queue
+import functools
 
 from enum import Enum, auto
 
 from .fsm_objects import (
-    StateType, State, Event, Transition
+    StateType, State, Event, Transition, Guard
 )
 
 
@@ -28,14 +31,94 @@ from .fsm_objects import (
 class FSMError(Exception):
     """Generic exception for the FSM"""
 
+class DecisionList:
+    """Ordered list of guarded targets for a (state, event) pair"""
+
+    def __init__(self) -> None:
+        """Constructor"""
+        self.choices: Tuple[Tuple[Optional[Guard], State], ...] = ()
+        self.unconditional = False          # True once a choice without guard is recorded
+
+    def append(self, guard: Optional[Guard], state: State) -> None:
+        """Add a new choice at the end of the list
+
+        Args:
+            guard : the guard to satisfy or None for an unconditional choice
+            state : the target state
+        """
+        self.choices = self.choices + ((guard, state),)
+        if guard is None:
+            self.unconditional = True
+
+    def select(self, context: Any) -> Optional[State]:
+        """Select the target state for a context
+
+        Args:
+            context : the context given to the FSM update
+
+        Returns:
+            The first state whose guard is satisfied or None
+        """
+        for guard, state in self.choices:
+            if guard is None or guard.check(context):
+                return state
+
+        return None
+
+    def selectMany(self, contexts: List[Any]) -> List[Optional[State]]:
+        """Select the target states for a list of contexts
+
+        Args:
+            contexts : the contexts to evaluate
+
+        Returns:
+            The list of states (or None) for each context
+        """
+        results: List[Optional[State]] = [None] * len(contexts)
+        pending = list(range(len(contexts)))
+
+        for guard, state in self.choices:
+            if not pending:
+                break
+
+            if guard is None:
+                for index in pending:
+                    results[index] = state
+                break
+
+            checks = guard.checkMany([contexts[index] for index in pending])
+            remaining = [ ]
+            for index, check in zip(pending, checks):
+                if check:
+                    results[index] = state
+                else:
+                    remaining.append(index)
+            pending = remaining
+
+        return results
+
+    def states(self) -> List[State]:
+        """Return all the target states of this list"""
+        return [state for _, state in self.choices]
+
 class FSM:
     """Main Finite State Machine Class"""
 
     def __init__(self) -> None:
         """Constructor"""
         self.has_ended = True                               # True when the FSM has ended
-        self.states: Dict[str, Dict[str, State]] = { }      # States in this FSM
+        # States in this FSM: name -> {'__object': State, event name -> State, DecisionList or List[State] (NFSM)}
+        self.states: Dict[str, Dict[str, Any]] = { }
         self.current: State = None                          # current running state
+        self.ids: Dict[str, int] = { }                      # state name -> state id
+        self.names: List[str] = [ ]                         # state id -> state name
+        self.event_ids: Dict[str, int] = { }                # event name -> event id
+        self.event_names: List[str] = [ ]                   # event id -> event name
+        self.observers: List[Callable] = [ ]                # callbacks notified on each move
+        self.history: Any = None                            # History written on each move
+        self.recorder: Any = None                           # TraceRecorder written on each move
+        self.recorder_id = -1                               # instance id of this FSM in the recorder
+        self.tracing = False                                # True if there is an observer, a history or a recorder
 
         self.user_callback = None       # the user callback method
         self.user_queue = None          # the user callback queue
@@ -72,15 +155,175 @@ class FSM:
             if transition.begin_state.name not in self.states:
                 self.states[transition.begin_state.name] = { }
                 self.states[transition.begin_state.name]['__object'] = transition.begin_state
+                self.ids[transition.begin_state.name] = len(self.ids)
+                self.names.append(transition.begin_state.name)
 
             # record the end state in the map
             if transition.end_state.name is not None:
                 if transition.end_state.name not in self.states:
                     self.states[transition.end_state.name] = { }
                     self.states[transition.end_state.name]['__object'] = transition.end_state
+                    self.ids[transition.end_state.name] = len(self.ids)
+                    self.names.append(transition.end_state.name)
+
+            # record the event
+            if transition.event.name not in self.event_ids:
+                self.event_ids[transition.event.name] = len(self.event_ids)
+                self.event_names.append(transition.event.name)
+
+            # keep the ids on the objects, so a move needs no lookup
+            self._setIds(transition)
 
             # associate both states with the event
-            self.states[transition.begin_state.name][transition.event.name] = transition.end_state
+            targets = self.states[transition.begin_state.name]
+            previous = targets.get(transition.event.name)
+
+            if transition.guard is None and not isinstance(previous, DecisionList):
+                targets[transition.event.name] = transition.end_state
+                continue
+
+            # guarded transitions are compiled in a decision list in declared order
+            if not isinstance(previous, DecisionList):
+                decision = DecisionList()
+                if previous is not None:
+                    decision.append(None, previous)
+                targets[transition.event.name] = decision
+
+            # a choice declared after an unconditional one would never be selected
+            if targets[transition.event.name].unconditional:
+                raise FSMError(f"Transition for state {transition.begin_state.name} and event {transition.event.name} "
+                               f"is shadowed by a transition without guard.")
+            targets[transition.event.name].append(transition.guard, transition.end_state)
+
+    def _setIds(self, transition: Transition) -> None:
+        """Give their ids to the states and the event of a transition
+
+        A state belongs to a single definition, an event can be shared
+        (it keeps the id of the first FSM and the other FSM look it up).
+
+        Args:
+            transition : the transition added
+        """
+        for state in (transition.begin_state, transition.end_state):
+            if state.name is None:
+                continue
+
+            state_id = self.ids[state.name]
+            if state.id >= 0 and state.id != state_id:
+                raise FSMError(f"State {state.name} already has the id {state.id} in another FSM definition.")
+            state.id = state_id
+
+        if transition.event.id < 0:
+            transition.event.id = self.event_ids[transition.event.name]
+
+    def observe(self, observer: Callable) -> None:
+        """Register a callback notified each time the FSM moves
+
+        The observer is called with (fsm, event_id, from_id, to_id) where the
+        ids are the values found in fsm.event_ids and fsm.ids.
+        start() and stop() use -1 as event id (and as from id if no current state).
+
+        Args:
+            observer : the callback to notify
+        """
+        if not callable(observer):
+            raise FSMError("observer must be a callable object.")
+
+        self.observers.append(observer)
+        self.tracing = True
+
+    def track(self, history: Any = None, recorder: Any = None, instance_id: int = -1) -> None:
+        """Record the moves of the FSM in a History and / or a TraceRecorder
+
+        A new history or recorder replaces the previous one.
+
+        Args:
+            history     : the History to write (None to keep the current one)
+            recorder    : the TraceRecorder to write (None to keep the current one)
+            instance_id : the instance id of this FSM in the recorder
+        """
+        if history is not None:
+            self.history = history
+        if recorder is not None:
+            self.recorder = recorder
+            self.recorder_id = instance_id
+
+        self.tracing = True
+
+    def untrack(self, history: bool = True, recorder: bool = True) -> None:
+        """Stop recording the moves of the FSM
+
+        Args:
+            history  : detach the History
+            recorder : detach the TraceRecorder
+        """
+        if history:
+            self.history = None
+        if recorder:
+            self.recorder = None
+            self.recorder_id = -1
+
+        self.tracing = bool(self.observers) or self.history is not None or self.recorder is not None
+
+    def _notify(self, event_id: int, from_state: Optional[State]) -> None:
+        """Notify the observers of a move to the current state
+
+        Args:
+            event_id   : the id of the event
+            from_state : the previous state
+        """
+        from_id = from_state.id if from_state is not None else -1
+        to_id = self.current.id
+
+        timestamp = time.time_ns()
+        if self.history is not None:
+            self.history.record(event_id, from_id, to_id, timestamp)
+        if self.recorder is not None:
+            self.recorder.record(self.recorder_id, event_id, from_id, to_id, timestamp)
+
+        for observer in self.observers:
+            observer(self, event_id, from_id, to_id)
+
+    def clone(self) -> FSM:
+        """Create a new FSM sharing the definition of this FSM
+
+        The states, the ids and the user callback / queue are shared, the new
+        FSM has no current state, no observer, no history and no recorder.
+        A queue bound to its FSM (ActionQueue) is replaced by a queue bound to
+        the new FSM through its bind() method.
+
+        Returns:
+            The new FSM
+        """
+        fsm = copy.copy(self)
+        fsm.current = None                  # type: ignore[assignment]
+        fsm.has_ended = True
+        fsm.observers = [ ]
+        fsm.history = None
+        fsm.recorder = None
+        fsm.recorder_id = -1
+        fsm.tracing = False
+
+        bind = getattr(self.user_queue, 'bind', None)
+        if bind is not None:
+            fsm.user_queue = bind(fsm)
+
+        return fsm
+
+    def restore(self, state_id: int, has_ended: bool) -> None:
+        """Set the FSM on a state previously saved with its id
+
+        Args:
+            state_id  : the id of the state (as found in fsm.ids)
+            has_ended : True if the FSM had ended
+        """
+        if state_id < 0 or state_id >= len(self.names):
+            raise FSMError(f"Unknown state id {state_id}.")
+
+        previous, self.current = self.current, self.states[self.names[state_id]]['__object']
+        self.has_ended = has_ended
+        if self.tracing:
+            self._notify(-1, previous)
 
     def state(self) -> str:
         """Get the current state name
@@ -99,8 +342,10 @@ class FSM:
             state: State = self.states[state_name]['__object']
 
             if state.state_type == StateType.FSM_BEGIN_STATE:
-                self.current = state
+                previous, self.current = self.current, state
                 self.has_ended = False
+                if self.tracing:
+                    self._notify(-1, previous)
                 return
 
         raise FSMError("FSM has no begin state.")
@@ -111,17 +356,49 @@ class FSM:
             state: State = self.states[state_name]['__object']
 
             if state.state_type == StateType.FSM_END_STATE:
-                self.current = state
+                previous, self.current = self.current, state
                 self.has_ended = True
+                if self.tracing:
+                    self._notify(-1, previous)
                 return
 
         raise FSMError("FSM has no end state.")
 
-    def update(self, event: Event) -> None:
+    def update(self, event: Event, context: Any = None) -> None:
         """Update the FSM with the new event
 
         Args:
-            event : an event that will move the FSM
+            event   : an event that will move the FSM
+            context : the context given to the guards of the transitions
+        """
+        # do nothing if the FSM has ended
+        if self.has_ended:
+            return
+
+        # ensure the event is defined for the current state
+        try:
+            end_state = self.states[self.current.name][event.name]
+        except KeyError:
+            raise FSMError(f"Event {event.name} is not defined for the current state {self.current.name}.") from None
+
+        # evaluate the guards in declared order
+        if end_state.__class__ is DecisionList:
+            end_state = end_state.select(context)
+            if end_state is None:
+                raise FSMError(f"No guard satisfied for state {self.current.name} and event {event.name}.")
+
+        # check for an invalid move
+        if end_state is None:
+            raise FSMError(f"Invalid transition for state {self.current.name} and event {event.name}.")
+
+        self._moveTo(end_state, event)
+
+    def _moveTo(self, end_state: State, event: Event) -> None:
+        """Move the FSM to a new state
+
+        Args:
+            end_state : the new state
+            event     : the event that triggered the move
         """
         def _sendUserAction(action: str):
             if action == "":
@@ -131,30 +408,85 @@ class FSM:
                 return
 
             self.user_queue.put(
-                lambda: self.user_callback(action)
+                functools.partial(self.user_callback, action)
             )
 
-        # do nothing if the FSM has ended
-        if self.has_ended:
-            return
-
-        # ensure the event is defined for the current state
-        if event.name not in self.states[self.current.name]:
-            raise FSMError(f"Event {event.name} is not defined for the current state {self.current.name}.")
-
-        # check for an invalid move
-        if self.states[self.current.name][event.name] is None:
-            raise FSMError(f"Invalid transition for state {self.current.name} and event {event.name}.")
-
         # move to the new state
+        previous = self.current
         _sendUserAction(self.current.exit_action)
-        self.current: State = self.states[self.current.name][event.name]
+        self.current: State = end_state
         _sendUserAction(self.current.enter_action)
 
         # check for completeness
         if self.current.state_type == StateType.FSM_END_STATE:
             self.has_ended = True
 
+        if not self.tracing:
+            return
+
+        # an event object created apart or added to another FSM first has another id
+        event_id = event.id
+        if event_id < 0 or event_id >= len(self.event_names) or self.event_names[event_id] != event.name:
+            event_id = self.event_ids[event.name]
+        from_id, to_id = previous.id, end_state.id
+
+        timestamp = time.time_ns()
+        if self.history is not None:
+            self.history.record(event_id, from_id, to_id, timestamp)
+        if self.recorder is not None:
+            self.recorder.record(self.recorder_id, event_id, from_id, to_id, timestamp)
+
+        for observer in self.observers:
+            observer(self, event_id, from_id, to_id)
+
+    @staticmethod
+    def updateBatch(instances: List[FSM], event: Event, contexts: List[Any]) -> List[Optional[FSMError]]:
+        """Update several FSM with the same event, evaluating the guards in batch
+
+        Instances sharing the same decision list are grouped so each guard is
+        evaluated once for the whole group.
+
+        Args:
+            instances : the FSM to update
+            event     : the event that will move the FSM
+            contexts  : the context for each FSM
+
+        Returns:
+            A list with the error raised for each FSM or None if the update succeeded
+        """
+        if len(instances) != len(contexts):
+            raise FSMError("instances and contexts must have the same length.")
+
+        errors: List[Optional[FSMError]] = [None] * len(instances)
+        groups: Dict[int, Tuple[DecisionList, List[int]]] = { }
+
+        for index, fsm in enumerate(instances):
+            if fsm.has_ended:
+                continue
+
+            # the DFA states of a NFSM are not in the table (and have no guard):
+            # they are updated one by one
+            target = fsm.states.get(fsm.current.name, { }).get(event.name)
+            if target.__class__ is DecisionList:
+                groups.setdefault(id(target), (target, [ ]))[1].append(index)
+                continue
+
+            try:
+                fsm.update(event, contexts[index])
+            except FSMError as error:
+                errors[index] = error
+
+        for decision, indexes in groups.values():
+            targets = decision.selectMany([contexts[index] for index in indexes])
+            for index, end_state in zip(indexes, targets):
+                fsm = instances[index]
+                if end_state is None:
+                    errors[index] = FSMError(f"No guard satisfied for state {fsm.current.name} and event {event.name}.")
+                else:
+                    fsm._moveTo(end_state, event)
+
+        return errors
+
     def can(self, state: State) -> bool:
         """Check if the state is valid from the current state
 
@@ -168,7 +500,8 @@ class FSM:
             # bypass the 'special' object
             if event == '__object':
                 continue
-            if self.states[self.current.name][event] == state:
+            target = self.states[self.current.name][event]
+            if target == state or (isinstance(target, DecisionList) and state in target.states()):
                 return True
 
         return False
@@ -186,7 +519,8 @@ class FSM:
             # bypass the 'special' object
             if event == '__object':
                 continue
-            if self.states[self.current.name][event] == state:
+            target = self.states[self.current.name][event]
+            if target == state or (isinstance(target, DecisionList) and state in target.states()):
                 return False
 
         return True
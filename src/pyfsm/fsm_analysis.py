@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Graph analysis of FSM definitions
+
+# ----- imports
+from __future__ import annotations
+from typing import List, Tuple
+
+from array import array
+from collections import deque
+
+from .fsm_objects import StateType, State
+from .fsm import FSM, DecisionList
+
+
+# ----- classes
+class AnalysisReport:
+    """Result of the analysis of a FSM definition"""
+
+    def __init__(self) -> None:
+        """Constructor"""
+        self.begin_states: List[str] = [ ]         # states of type BEGIN
+        self.end_states: List[str] = [ ]           # states of type END
+        self.unreachable: List[str] = [ ]          # states that cannot be reached from a BEGIN state
+        self.dead_ends: List[str] = [ ]            # states that cannot reach an END state
+        self.traps: List[List[str]] = [ ]          # strongly connected components that cannot be left nor ended
+        self.components = 0                        # number of strongly connected components
+
+    def issues(self) -> List[str]:
+        """Describe the problems found in the definition
+
+        Returns:
+            A list of messages (empty if the definition is sound)
+        """
+        messages = [ ]
+        if not self.begin_states:
+            messages.append("FSM has no begin state.")
+        if self.unreachable:
+            messages.append(f"States cannot be reached from a begin state: {', '.join(self.unreachable)}.")
+        if self.dead_ends:
+            messages.append(f"States cannot reach an end state: {', '.join(self.dead_ends)}.")
+        for trap in self.traps:
+            messages.append(f"States form a trap with no exit: {', '.join(trap)}.")
+
+        return messages
+
+
+class FSMAnalyzer:
+    """Analyze the graph of a FSM definition
+
+    The definition is compiled into an integer adjacency list (CSR) and all
+    the passes (Tarjan SCC, reachability, co-reachability) are iterative and
+    run in linear time on the number of transitions.
+    """
+
+    def __init__(self, fsm: FSM) -> None:
+        """Constructor
+
+        Args:
+            fsm : the FSM to analyze (FSM or NFSM)
+        """
+        self.fsm = fsm
+        self.names: List[str] = list(fsm.names)
+        self.offsets, self.targets = self._compile()
+
+    def _compile(self) -> Tuple[array, array]:
+        """Compile the transitions into a CSR adjacency list
+
+        The transitions leaving an END state are dropped: the FSM ignores
+        the events once it has ended, so they can never be taken.
+
+        Returns:
+            The offsets (one per state + 1) and the target state ids
+        """
+        ids = self.fsm.ids
+        offsets = array('i', [0])
+        targets = array('i')
+
+        for name in self.names:
+            if self.fsm.states[name]['__object'].state_type == StateType.FSM_END_STATE:
+                offsets.append(len(targets))
+                continue
+
+            for event, target in self.fsm.states[name].items():
+                if event == '__object':
+                    continue
+
+                if isinstance(target, DecisionList):
+                    states = target.states()
+                elif isinstance(target, list):
+                    states = target
+                else:
+                    states = [target]
+
+                for state in states:
+                    if state is not None and state.name is not None:
+                        targets.append(ids[state.name])
+
+            offsets.append(len(targets))
+
+        return offsets, targets
+
+    def _reverse(self) -> Tuple[array, array]:
+        """Build the CSR adjacency list of the reversed graph
+
+        Returns:
+            The offsets (one per state + 1) and the source state ids
+        """
+        count = len(self.names)
+        offsets = array('i', [0]) * (count + 1)
+        for target in self.targets:
+            offsets[target + 1] += 1
+        for index in range(count):
+            offsets[index + 1] += offsets[index]
+
+        sources = array('i', [0]) * len(self.targets)
+        position = array('i', offsets[:count])
+        for source in range(count):
+            for index in range(self.offsets[source], self.offsets[source + 1]):
+                target = self.targets[index]
+                sources[position[target]] = source
+                position[target] += 1
+
+        return offsets, sources
+
+    def _reach(self, starts: List[int], offsets: array, targets: array) -> bytearray:
+        """Mark the states reachable from a set of states
+
+        Args:
+            starts  : the ids of the starting states
+            offsets : the CSR offsets
+            targets : the CSR targets
+
+        Returns:
+            A flag for each state (1 if reachable)
+        """
+        seen = bytearray(len(self.names))
+        queue = deque(starts)
+        for start in starts:
+            seen[start] = 1
+
+        while queue:
+            state_id = queue.popleft()
+            for index in range(offsets[state_id], offsets[state_id + 1]):
+                target = targets[index]
+                if not seen[target]:
+                    seen[target] = 1
+                    queue.append(target)
+
+        return seen
+
+    def components(self) -> Tuple[int, array]:
+        """Compute the strongly connected components (iterative Tarjan)
+
+        Returns:
+            The number of components and the component id of each state
+        """
+        count = len(self.names)
+        offsets, targets = self.offsets, self.targets
+
+        index = array('i', [-1]) * count
+        low = array('i', [0]) * count
+        component = array('i', [-1]) * count
+        on_stack = bytearray(count)
+        stack: List[int] = [ ]
+        counter = 0
+        components = 0
+
+        for root in range(count):
+            if index[root] != -1:
+                continue
+
+            # explicit call stack: state id and next edge to visit
+            work_states = [root]
+            work_edges = [offsets[root]]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+
+            while work_states:
+                state_id = work_states[-1]
+                edge = work_edges[-1]
+
+                if edge < offsets[state_id + 1]:
+                    work_edges[-1] = edge + 1
+                    target = targets[edge]
+
+                    if index[target] == -1:
+                        index[target] = low[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        on_stack[target] = 1
+                        work_states.append(target)
+                        work_edges.append(offsets[target])
+
+                    elif on_stack[target] and index[target] < low[state_id]:
+                        low[state_id] = index[target]
+
+                    continue
+
+                # all the edges are visited
+                work_states.pop()
+                work_edges.pop()
+                if work_states:
+                    parent = work_states[-1]
+                    if low[state_id] < low[parent]:
+                        low[parent] = low[state_id]
+
+                if low[state_id] == index[state_id]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component[member] = components
+                        if member == state_id:
+                            break
+                    components += 1
+
+        return components, component
+
+    def run(self) -> AnalysisReport:
+        """Analyze the definition
+
+        Dead ends and traps are only searched when the definition has END states,
+        a FSM without END state is considered as never ending on purpose.
+
+        Returns:
+            The report of the analysis
+        """
+        report = AnalysisReport()
+        count = len(self.names)
+
+        begin_ids = [ ]
+        end_ids = [ ]
+        for state_id, name in enumerate(self.names):
+            state: State = self.fsm.states[name]['__object']
+            if state.state_type == StateType.FSM_BEGIN_STATE:
+                begin_ids.append(state_id)
+            elif state.state_type == StateType.FSM_END_STATE:
+                end_ids.append(state_id)
+
+        report.begin_states = [self.names[state_id] for state_id in begin_ids]
+        report.end_states = [self.names[state_id] for state_id in end_ids]
+
+        # reachability from the begin states
+        if begin_ids:
+            reached = self._reach(begin_ids, self.offsets, self.targets)
+            report.unreachable = [self.names[state_id] for state_id in range(count) if not reached[state_id]]
+
+        components, component = self.components()
+        report.components = components
+
+        if not end_ids:
+            return report
+
+        # co-reachability to the end states
+        reverse_offsets, reverse_sources = self._reverse()
+        ending = self._reach(end_ids, reverse_offsets, reverse_sources)
+        report.dead_ends = [self.names[state_id] for state_id in range(count) if not ending[state_id]]
+
+        # traps: components with no END state and no transition leaving them
+        has_exit = bytearray(components)
+        has_end = bytearray(components)
+        for state_id in end_ids:
+            has_end[component[state_id]] = 1
+        for state_id in range(count):
+            for edge in range(self.offsets[state_id], self.offsets[state_id + 1]):
+                if component[self.targets[edge]] != component[state_id]:
+                    has_exit[component[state_id]] = 1
+                    break
+
+        members: List[List[str]] = [[ ] for _ in range(components)]
+        for state_id in range(count):
+            if not has_exit[component[state_id]] and not has_end[component[state_id]]:
+                members[component[state_id]].append(self.names[state_id])
+        report.traps = [trap for trap in members if trap]
+
+        return report
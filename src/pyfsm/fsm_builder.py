@@ -13,18 +13,20 @@
 
 # ----- imports
 from __future__ import annotations
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
 import os
 import yaml
 
-from __about__ import __version__
+from .__about__ import __version__
 
 from .fsm_objects import (
-    StateType, State, Event, Transition
+    StateType, State, Event, Transition, Guard
 )
 
-from .fsm import FSM
+from .fsm import FSM, FSMError
+from .fsm_nfa import NFSM, EPSILON
+from .fsm_analysis import FSMAnalyzer
 
 
 # ----- classes
@@ -34,6 +36,9 @@ class FSMBuilderError(Exception):
 class FSMBuilderComposite(object):
     """ Composite object returned by the builder """
 
+    FSM: FSM                    # the FSM object (FSM or NFSM)
+    events: List[str]           # the events found in the YAML definition
+
 class FSMBuilder(object):
     """ Build a FSM from a YAML definition file """
 
@@ -118,15 +123,21 @@ class FSMBuilder(object):
 
             self.states[state['name']] = State(state['name'],state_type,enter_action,exit_action)
 
-    def _buildTransitions(self, transitions: List[Dict[str, str]]) -> None:
+    def _buildTransitions(self, transitions: List[Dict[str, str]], nondeterministic: bool = False,
+                          guards: Optional[Dict[str, Guard | Callable]] = None) -> None:
         """Build transition objects for a list of definition
 
         Args:
-            transitions: a list containing all the transitions object from the YAML definition
+            transitions      : a list containing all the transitions object from the YAML definition
+            nondeterministic : allow transitions with no event (epsilon moves)
+            guards           : the guards referenced by name in the YAML definition
         """
         for transition in transitions:
             if 'event' not in transition:
-                raise FSMBuilderError(f"Found a transition with no event associated.")
+                if not nondeterministic:
+                    raise FSMBuilderError(f"Found a transition with no event associated.")
+                transition['event'] = EPSILON
+                self.events.setdefault(EPSILON, Event(EPSILON))
             else:
                 if transition['event'] not in self.events:
                     raise FSMBuilderError(f"Cannot find event {transition['event']} in the list of defined events.")
@@ -143,16 +154,28 @@ class FSMBuilder(object):
                 if transition['end'] not in self.states:
                     raise FSMBuilderError(f"Cannot find state {transition['end']} in the list of defined states.")
 
+            guard: Optional[Guard] = None
+            if 'guard' in transition:
+                if guards is None or transition['guard'] not in guards:
+                    raise FSMBuilderError(f"Cannot find guard {transition['guard']} in the list of defined guards.")
+
+                declared = guards[transition['guard']]
+                guard = declared if isinstance(declared, Guard) else Guard(transition['guard'], declared)
+                guards[transition['guard']] = guard
+
             event = self.events[transition['event']]
             begin_state = self.states[transition['begin']]
             end_state = self.states[transition['end']]
-            self.transitions.append(Transition(event,begin_state,end_state))
+            self.transitions.append(Transition(event,begin_state,end_state,guard))
 
-    def parse(self, event_objects=True) -> FSMBuilderComposite:
+    def parse(self, event_objects=True, nondeterministic=False, guards=None, strict=False) -> FSMBuilderComposite:
         """Parse the YAML file and return composite object with the FSM and the list of events
 
         Args:
-            event_objects : create objects Exx corresponding to each event in the YAML definition
+            event_objects    : create objects Exx corresponding to each event in the YAML definition
+            nondeterministic : build a NFSM (duplicated transitions and epsilon moves allowed)
+            guards           : a dictionary of Guard objects (or callables) referenced in the YAML definition
+            strict           : analyze the graph and reject unused, unreachable, dead-end or trap states
 
         Returns:
             A FSM Composite object that encapsulates the FSM and its events
@@ -183,12 +206,26 @@ class FSMBuilder(object):
         if 'Transitions' not in data:
             raise FSMBuilderError(f"Cannot find the list of Transitions in {self.filename}.")
         else:
-            self._buildTransitions(data['Transitions'])
+            self._buildTransitions(data['Transitions'], nondeterministic, dict(guards or { }))
 
         # create the FSM
         obj = FSMBuilderComposite()
-        obj.FSM = FSM()
-        obj.FSM.add(self.transitions)
+        obj.FSM = NFSM() if nondeterministic else FSM()
+        try:
+            obj.FSM.add(self.transitions)
+        except FSMError as error:
+            raise FSMBuilderError(str(error)) from None
+
+        # check the graph
+        if strict:
+            issues = FSMAnalyzer(obj.FSM).run().issues()
+
+            unused = [name for name in self.states if name not in obj.FSM.ids]
+            if unused:
+                issues.append(f"States are not used by any transition: {', '.join(unused)}.")
+
+            if issues:
+                raise FSMBuilderError(" ".join(issues))
 
         # set the events
         obj.events = data['Events']
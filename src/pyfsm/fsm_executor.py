@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Parallel execution of the user actions
+
+# ----- imports
+from __future__ import annotations
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import time
+import queue
+import functools
+import threading
+
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+from .fsm import FSM, FSMError
+
+
+# ----- classes
+class ActionResult:
+    """Result of a user action executed by the ActionExecutor"""
+
+    def __init__(self, fsm: FSM, action: Any, value: Any, error: Optional[BaseException], latency: float) -> None:
+        """Constructor
+
+        Args:
+            fsm     : the FSM that produced the action
+            action  : the action string sent to the user callback
+            value   : the value returned by the user callback
+            error   : the exception raised by the user callback or None
+            latency : the time (in seconds) between the queuing and the end of the action
+        """
+        self.fsm = fsm
+        self.action = action
+        self.value = value
+        self.error = error
+        self.latency = latency
+
+
+class ActionQueue(queue.Queue):
+    """User queue forwarding the actions of a FSM to the ActionExecutor"""
+
+    def __init__(self, executor: ActionExecutor, fsm: FSM) -> None:
+        """Constructor
+
+        Args:
+            executor : the executor running the actions
+            fsm      : the FSM owning this queue
+        """
+        super().__init__()
+        self.executor = executor
+        self.fsm = fsm
+
+    def put(self, item: Callable, block: bool = True, timeout: Optional[float] = None) -> None:
+        """Forward the action to the executor
+
+        Args:
+            item    : the callable pushed by the FSM
+            block   : unused, kept for compatibility with queue.Queue
+            timeout : unused, kept for compatibility with queue.Queue
+        """
+        self.executor.submit(self.fsm, item)
+
+    def bind(self, fsm: FSM) -> ActionQueue:
+        """Create a queue forwarding the actions of another FSM (used by FSM.clone)
+
+        Args:
+            fsm : the FSM owning the new queue
+
+        Returns:
+            The new queue, on the same executor
+        """
+        return ActionQueue(self.executor, fsm)
+
+
+class ActionExecutor:
+    """Run the user actions on a pool of workers
+
+    The actions of the same FSM are executed in order, one at a time, while the
+    actions of different FSM run in parallel.
+    """
+
+    def __init__(self, workers: int = 4, processes: bool = False) -> None:
+        """Constructor
+
+        Args:
+            workers   : the number of workers in the pool
+            processes : use a pool of processes instead of threads
+                        (the user callback must then be picklable)
+        """
+        if workers < 1:
+            raise FSMError("workers must be greater than 0.")
+
+        self.pool: Executor = ProcessPoolExecutor(workers) if processes else ThreadPoolExecutor(workers)
+        self.lock = threading.RLock()
+        self.ready = threading.Condition(self.lock)
+
+        self.lanes: Dict[int, Deque[Tuple[Callable, float]]] = { }     # pending actions per FSM
+        self.completed: Deque[ActionResult] = deque()                   # results not yet delivered
+
+        # statistics
+        self.pending = 0
+        self.executed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def attach(self, fsm: FSM, user_callback: Callable) -> None:
+        """Setup a FSM to send its actions to this executor
+
+        Args:
+            fsm           : the FSM
+            user_callback : the user callback method
+        """
+        fsm.setup(user_callback, ActionQueue(self, fsm))
+
+    def submit(self, fsm: FSM, item: Callable) -> None:
+        """Queue an action for a FSM
+
+        Args:
+            fsm  : the FSM producing the action
+            item : the callable to execute
+        """
+        key = id(fsm)
+        with self.lock:
+            self.pending += 1
+            if key in self.lanes:
+                self.lanes[key].append((item, time.perf_counter()))
+                return
+
+            self.lanes[key] = deque()
+            self._run(fsm, item, time.perf_counter())
+
+    def _run(self, fsm: FSM, item: Callable, queued: float) -> None:
+        """Send an action to the pool (the lock must be held)
+
+        If the pool is shut down (or broken), the action and all the actions
+        waiting in the lane of the FSM are recorded as failed.
+
+        Args:
+            fsm    : the FSM producing the action
+            item   : the callable to execute
+            queued : the time when the action was queued
+        """
+        try:
+            future = self.pool.submit(item)
+        except RuntimeError as error:
+            lane = self.lanes.pop(id(fsm), deque())
+            self._record(fsm, item, queued, None, error)
+            for next_item, next_queued in lane:
+                self._record(fsm, next_item, next_queued, None, error)
+            return
+
+        future.add_done_callback(functools.partial(self._done, fsm, item, queued))
+
+    def _record(self, fsm: FSM, item: Callable, queued: float, value: Any, error: Optional[BaseException]) -> None:
+        """Record the result of an action
+
+        Args:
+            fsm    : the FSM producing the action
+            item   : the callable executed
+            queued : the time when the action was queued
+            value  : the value returned by the action
+            error  : the exception raised by the action or None
+        """
+        latency = time.perf_counter() - queued
+        action = item.args[0] if isinstance(item, functools.partial) and item.args else None
+
+        with self.lock:
+            self.pending -= 1
+            self.executed += 1
+            if error is not None:
+                self.failed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+            self.completed.append(ActionResult(fsm, action, value, error, latency))
+            self.ready.notify_all()
+
+    def _done(self, fsm: FSM, item: Callable, queued: float, future: Future) -> None:
+        """Record the result of an action and start the next one for the same FSM
+
+        Args:
+            fsm    : the FSM producing the action
+            item   : the callable executed
+            queued : the time when the action was queued
+            future : the future of the action
+        """
+        error = future.exception()
+        value = None if error is not None else future.result()
+
+        with self.lock:
+            self._record(fsm, item, queued, value, error)
+
+            # keep the order for this FSM
+            lane = self.lanes[id(fsm)]
+            if lane:
+                next_item, next_queued = lane.popleft()
+                self._run(fsm, next_item, next_queued)
+            else:
+                del self.lanes[id(fsm)]
+
+    def results(self, max_results: Optional[int] = None, timeout: Optional[float] = 0) -> List[ActionResult]:
+        """Retrieve a batch of results
+
+        The results of the same FSM are delivered in the order of the actions.
+
+        Args:
+            max_results : the maximum number of results to return (all if None)
+            timeout     : time to wait for at least one result (0 to return at once, None to wait forever)
+
+        Returns:
+            The list of results completed since the last call
+        """
+        with self.lock:
+            if not self.completed and timeout != 0:
+                self.ready.wait_for(lambda: len(self.completed) > 0, timeout)
+
+            count = len(self.completed) if max_results is None else min(max_results, len(self.completed))
+            return [self.completed.popleft() for _ in range(count)]
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for all the queued actions to complete
+
+        Args:
+            timeout : the maximum time to wait (forever if None)
+
+        Returns:
+            True if all the actions are completed
+        """
+        with self.lock:
+            return self.ready.wait_for(lambda: self.pending == 0, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the statistics of the executor
+
+        Returns:
+            A dictionary with the queue depth, the number of busy FSM, the number of
+            executed / failed actions and the mean / max latency in seconds
+        """
+        with self.lock:
+            return {
+                'pending': self.pending,
+                'busy': len(self.lanes),
+                'executed': self.executed,
+                'failed': self.failed,
+                'mean_latency': self.total_latency / self.executed if self.executed else 0.0,
+                'max_latency': self.max_latency,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool of workers
+
+        Args:
+            wait : wait for all the queued actions (running or not) to complete
+        """
+        if wait:
+            self.join()
+
+        self.pool.shutdown(wait=wait)
+
+    def __enter__(self) -> ActionExecutor:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
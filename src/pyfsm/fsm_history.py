@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Transition history and trace recording
+
+# ----- imports
+from __future__ import annotations
+from typing import Any, BinaryIO, Iterator, List, Optional, Tuple
+
+import struct
+import weakref
+
+from array import array
+
+from .fsm import FSM, FSMError
+
+
+# ----- globals
+TRACE_MAGIC = b"FSMT"                   # magic number at the beginning of a trace file
+TRACE_COLUMNS = ('i', 'i', 'i', 'i', 'q')   # instance, event, from, to, timestamp
+
+
+# ----- classes
+class History:
+    """Fixed-size ring buffer with the last transitions of a FSM"""
+
+    def __init__(self, fsm: FSM, size: int = 64) -> None:
+        """Constructor
+
+        Args:
+            fsm  : the FSM to record
+            size : the maximum number of transitions kept
+        """
+        if size < 1:
+            raise FSMError("History size must be greater than 0.")
+
+        self.fsm = fsm
+        self.size = size
+        self.index = 0              # next slot to write
+        self.count = 0              # number of slots written
+
+        # preallocated columns
+        self.event_ids = array('i', [0]) * size
+        self.from_ids = array('i', [0]) * size
+        self.to_ids = array('i', [0]) * size
+        self.timestamps = array('q', [0]) * size
+
+        fsm.track(history=self)
+
+    def detach(self) -> None:
+        """Stop recording the transitions of the FSM"""
+        if self.fsm.history is self:
+            self.fsm.untrack(recorder=False)
+
+    def record(self, event_id: int, from_id: int, to_id: int, timestamp: int) -> None:
+        """Record a transition (called by the FSM)
+
+        Args:
+            event_id  : the id of the event
+            from_id   : the id of the previous state
+            to_id     : the id of the new state
+            timestamp : the time of the transition in ns
+        """
+        index = self.index
+        self.event_ids[index] = event_id
+        self.from_ids[index] = from_id
+        self.to_ids[index] = to_id
+        self.timestamps[index] = timestamp
+
+        index += 1
+        self.index = 0 if index == self.size else index
+        if self.count < self.size:
+            self.count += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def entries(self) -> List[Tuple[str, str, str, int]]:
+        """Decode the transitions recorded, from the oldest to the newest
+
+        Returns:
+            A list of (event name, from state name, to state name, timestamp in ns)
+            start() and stop() are recorded with an empty event name
+        """
+        state_names = self.fsm.names
+        event_names = list(self.fsm.event_ids)
+
+        def _name(names: List[str], value: int) -> str:
+            return names[value] if value >= 0 else ""
+
+        first = (self.index - self.count) % self.size
+        result = [ ]
+        for offset in range(self.count):
+            index = (first + offset) % self.size
+            result.append((
+                _name(event_names, self.event_ids[index]),
+                _name(state_names, self.from_ids[index]),
+                _name(state_names, self.to_ids[index]),
+                self.timestamps[index]
+            ))
+
+        return result
+
+    def clear(self) -> None:
+        """Forget all the transitions recorded"""
+        self.index = 0
+        self.count = 0
+
+
+class TraceRecorder:
+    """Columnar recorder for the transitions of several FSM
+
+    Transitions are written in preallocated chunks that are flushed to a
+    binary file when full, so the memory used is bounded by the chunk size.
+    """
+
+    def __init__(self, filename: str, chunk_size: int = 65536) -> None:
+        """Constructor
+
+        Args:
+            filename   : the name of the binary trace file
+            chunk_size : the number of transitions kept in memory before a flush
+        """
+        if chunk_size < 1:
+            raise FSMError("chunk_size must be greater than 0.")
+
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.count = 0                  # number of rows in the current chunk
+        self.instances = 0              # number of FSM attached
+        self.attached: weakref.WeakSet[FSM] = weakref.WeakSet()     # FSM detached on close
+
+        self.columns = [array(code, [0]) * chunk_size for code in TRACE_COLUMNS]
+        self.stream: Optional[BinaryIO] = open(filename, 'wb')
+        self.stream.write(TRACE_MAGIC)
+
+    def attach(self, fsm: FSM) -> int:
+        """Record the transitions of a FSM
+
+        Args:
+            fsm : the FSM to record
+
+        Returns:
+            The instance id used in the trace for this FSM
+        """
+        if self.stream is None:
+            raise FSMError("Cannot attach a FSM to a closed trace.")
+
+        instance_id = self.instances
+        self.instances += 1
+        fsm.track(recorder=self, instance_id=instance_id)
+        self.attached.add(fsm)
+        return instance_id
+
+    def detach(self, fsm: FSM) -> None:
+        """Stop recording the transitions of a FSM
+
+        Args:
+            fsm : the FSM to detach
+        """
+        if fsm.recorder is self:
+            fsm.untrack(history=False)
+        self.attached.discard(fsm)
+
+    def record(self, instance_id: int, event_id: int, from_id: int, to_id: int, timestamp: int) -> None:
+        """Record a transition (called by the FSM)
+
+        Args:
+            instance_id : the id of the instance in the trace
+            event_id    : the id of the event
+            from_id     : the id of the previous state
+            to_id       : the id of the new state
+            timestamp   : the time of the transition in ns
+        """
+        if self.stream is None:
+            raise FSMError("Cannot record transitions in a closed trace.")
+
+        index = self.count
+        instances, events, from_ids, to_ids, timestamps = self.columns
+        instances[index] = instance_id
+        events[index] = event_id
+        from_ids[index] = from_id
+        to_ids[index] = to_id
+        timestamps[index] = timestamp
+
+        self.count = index + 1
+        if self.count == self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the current chunk to the trace file"""
+        if self.stream is None or self.count == 0:
+            return
+
+        self.stream.write(struct.pack('<I', self.count))
+        for column in self.columns:
+            self.stream.write(memoryview(column)[:self.count].tobytes())
+
+        self.stream.flush()
+        self.count = 0
+
+    def close(self) -> None:
+        """Flush the remaining transitions, detach the FSM and close the trace file"""
+        if self.stream is None:
+            return
+
+        for fsm in list(self.attached):
+            self.detach(fsm)
+
+        self.flush()
+        self.stream.close()
+        self.stream = None
+
+    def __enter__(self) -> TraceRecorder:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @staticmethod
+    def read(filename: str) -> Iterator[Tuple[array, ...]]:
+        """Read a trace file chunk by chunk
+
+        Args:
+            filename : the name of the binary trace file
+
+        Returns:
+            An iterator on the chunks, each chunk being a tuple of columns
+            (instance ids, event ids, from ids, to ids, timestamps)
+        """
+        with open(filename, 'rb') as stream:
+            if stream.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+                raise FSMError(f"{filename} is not a trace file.")
+
+            while True:
+                header = stream.read(4)
+                if len(header) < 4:
+                    return
+
+                count, = struct.unpack('<I', header)
+                chunk = [ ]
+                for code in TRACE_COLUMNS:
+                    column = array(code)
+                    column.frombytes(stream.read(count * column.itemsize))
+                    chunk.append(column)
+
+                yield tuple(chunk)
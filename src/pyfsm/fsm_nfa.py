@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Nondeterministic FSM with lazy subset construction
+
+# ----- imports
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, FrozenSet, Optional, Tuple
+
+import functools
+
+from collections import OrderedDict
+
+from .fsm_objects import (
+    StateType, State, Event, Transition
+)
+
+from .fsm import FSM, FSMError
+
+
+# ----- globals
+EPSILON = "__epsilon"               # name of the event used for epsilon moves
+DEFAULT_CACHE_SIZE = 4096           # default number of DFA states kept in the cache
+
+
+# ----- classes
+class DFAState:
+    """A deterministic state built from a set of NFA states"""
+
+    def __init__(self, members: FrozenSet[str], states: List[State]) -> None:
+        """Constructor
+
+        Args:
+            members : the names of the NFA states composing this state
+            states  : the NFA states objects, in definition order
+        """
+        self.members = members
+        self.states = states
+        self.transitions: Dict[str, DFAState] = { }     # memoized moves for this state
+        self.evicted = False                            # True once removed from the cache
+
+        if len(states) == 1:
+            self.name = states[0].name
+        else:
+            self.name = "{" + ",".join([state.name for state in states]) + "}"
+
+        # the actions are computed once for all
+        self.exit_actions = [state.exit_action for state in states if state.exit_action != ""]
+        self.enter_actions = [state.enter_action for state in states if state.enter_action != ""]
+
+        # the DFA state is final as soon as one of its members is final
+        self.is_end = any([state.state_type == StateType.FSM_END_STATE for state in states])
+
+
+class NFSM(FSM):
+    """Nondeterministic Finite State Machine
+
+    Duplicated (state, event) pairs and epsilon moves are allowed.
+    The deterministic states are built on the fly when an event is received
+    and kept in a bounded LRU cache, so a warm machine runs at DFA speed.
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """Constructor
+
+        Args:
+            cache_size : the maximum number of DFA states kept in the cache
+        """
+        super().__init__()
+
+        if cache_size < 1:
+            raise FSMError("cache_size must be greater than 0.")
+
+        self.cache_size = cache_size
+        self.cache: OrderedDict[FrozenSet[str], DFAState] = OrderedDict()
+        self.current: Any = None                            # current DFAState
+
+    def add(self, transitions: List[Transition] | Transition) -> None:
+        """Add one or more transition to the FSM
+
+        Args:
+            transitions : a transition or a list of transitions
+                          a transition with an event named EPSILON is an epsilon move
+        """
+        # transform the single transition into a list
+        if not isinstance(transitions, list):
+            transitions = [transitions]
+
+        for transition in transitions:
+            if transition.guard is not None:
+                raise FSMError("Guarded transitions are not supported by the NFSM.")
+
+            # record the begin state in the map
+            if transition.begin_state.name not in self.states:
+                self.states[transition.begin_state.name] = { }
+                self.states[transition.begin_state.name]['__object'] = transition.begin_state
+                self.ids[transition.begin_state.name] = len(self.ids)
+                self.names.append(transition.begin_state.name)
+
+            # record the end state in the map
+            if transition.end_state.name is not None:
+                if transition.end_state.name not in self.states:
+                    self.states[transition.end_state.name] = { }
+                    self.states[transition.end_state.name]['__object'] = transition.end_state
+                    self.ids[transition.end_state.name] = len(self.ids)
+                    self.names.append(transition.end_state.name)
+
+            # record the event
+            if transition.event.name not in self.event_ids:
+                self.event_ids[transition.event.name] = len(self.event_ids)
+                self.event_names.append(transition.event.name)
+
+            self._setIds(transition)
+
+            # keep all the targets for the same (state, event) pair
+            targets = self.states[transition.begin_state.name].setdefault(transition.event.name, [])
+            if transition.end_state.name is not None:
+                targets.append(transition.end_state)
+
+        # the definition has changed, the DFA states are no longer valid
+        self.clear()
+
+    def observe(self, observer: Callable) -> None:
+        """Register a callback notified each time the FSM moves
+
+        The DFA states have no stable id, so observers are not supported.
+
+        Args:
+            observer : the callback to notify
+        """
+        raise FSMError("Observers are not supported by the NFSM.")
+
+    def track(self, history: Any = None, recorder: Any = None, instance_id: int = -1) -> None:
+        """Record the moves of the FSM in a History and / or a TraceRecorder
+
+        The DFA states have no stable id, so recording is not supported.
+
+        Args:
+            history     : the History to write
+            recorder    : the TraceRecorder to write
+            instance_id : the instance id of this FSM in the recorder
+        """
+        raise FSMError("History and traces are not supported by the NFSM.")
+
+    def restore(self, state_id: int, has_ended: bool) -> None:
+        """Set the FSM on a state previously saved with its id
+
+        The DFA states have no stable id, so restoring is not supported.
+
+        Args:
+            state_id  : the id of the state
+            has_ended : True if the FSM had ended
+        """
+        raise FSMError("Restoring a state is not supported by the NFSM.")
+
+    def clear(self) -> None:
+        """Remove all the DFA states from the cache"""
+        for dfa_state in self.cache.values():
+            dfa_state.evicted = True
+            dfa_state.transitions.clear()
+        self.cache.clear()
+
+    def _closure(self, names: List[str]) -> FrozenSet[str]:
+        """Compute the epsilon closure of a set of NFA states
+
+        Args:
+            names : the names of the NFA states
+
+        Returns:
+            The names of all the states reachable through epsilon moves
+        """
+        closure = set(names)
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            for state in self.states[name].get(EPSILON, []):
+                if state.name not in closure:
+                    closure.add(state.name)
+                    stack.append(state.name)
+
+        return frozenset(closure)
+
+    def _getState(self, members: FrozenSet[str]) -> DFAState:
+        """Retrieve a DFA state from the cache or build it
+
+        Args:
+            members : the names of the NFA states (already closed)
+
+        Returns:
+            The DFA state corresponding to these members
+        """
+        dfa_state = self.cache.get(members)
+        if dfa_state is not None:
+            self.cache.move_to_end(members)
+            return dfa_state
+
+        # keep the definition order for the actions
+        states = [self.states[name]['__object'] for name in self.states if name in members]
+        dfa_state = DFAState(members, states)
+
+        # evict the least recently used state
+        if len(self.cache) >= self.cache_size:
+            _, evicted = self.cache.popitem(last=False)
+            evicted.evicted = True
+            evicted.transitions.clear()
+
+        self.cache[members] = dfa_state
+        return dfa_state
+
+    def _move(self, dfa_state: DFAState, event_name: str) -> Optional[DFAState]:
+        """Compute the DFA state reached from a DFA state with an event
+
+        Args:
+            dfa_state  : the starting DFA state
+            event_name : the name of the event
+
+        Returns:
+            The DFA state reached or None if no NFA state accepts the event
+        """
+        # make sure the memoized move is recorded on the live object
+        if dfa_state.evicted:
+            dfa_state = self._getState(dfa_state.members)
+
+        targets = [ ]
+        for name in dfa_state.members:
+            for state in self.states[name].get(event_name, []):
+                targets.append(state.name)
+
+        if not targets:
+            return None
+
+        next_state = self._getState(self._closure(targets))
+        dfa_state.transitions[event_name] = next_state
+        return next_state
+
+    def start(self) -> None:
+        """Set the FSM on the starting states"""
+        names = [
+            name for name in self.states
+            if self.states[name]['__object'].state_type == StateType.FSM_BEGIN_STATE
+        ]
+
+        if not names:
+            raise FSMError("FSM has no begin state.")
+
+        self.current = self._getState(self._closure(names))
+        self.has_ended = self.current.is_end
+
+    def stop(self) -> None:
+        """Set the FSM on the ending state"""
+        for state_name in self.states:
+            state: State = self.states[state_name]['__object']
+
+            if state.state_type == StateType.FSM_END_STATE:
+                self.current = self._getState(frozenset([state_name]))
+                self.has_ended = True
+                return
+
+        raise FSMError("FSM has no end state.")
+
+    def update(self, event: Event, context: Any = None) -> None:
+        """Update the FSM with the new event
+
+        Args:
+            event   : an event that will move the FSM
+            context : unused, guards are not supported by the NFSM
+        """
+        # do nothing if the FSM has ended
+        if self.has_ended:
+            return
+
+        # fast path: the move has already been computed
+        next_state = self.current.transitions.get(event.name)
+        if next_state is None or next_state.evicted:
+            next_state = self._move(self.current, event.name)
+            if next_state is None:
+                raise FSMError(f"Event {event.name} is not defined for the current state {self.current.name}.")
+
+        # move to the new state
+        if self.user_queue is not None and self.user_callback is not None:
+            for action in self.current.exit_actions:
+                self.user_queue.put(functools.partial(self.user_callback, action))
+            for action in next_state.enter_actions:
+                self.user_queue.put(functools.partial(self.user_callback, action))
+
+        self.current = next_state
+
+        # check for completeness
+        if self.current.is_end:
+            self.has_ended = True
+
+    def can(self, state: State) -> bool:
+        """Check if the state is valid from the current state
+
+        Args:
+            state : the targeted state
+
+        Returns:
+            True if the state is a valid state from one of the current states
+        """
+        for name in self.current.members:
+            for event in self.states[name]:
+                # bypass the 'special' object
+                if event == '__object':
+                    continue
+                if state in self.states[name][event]:
+                    return True
+
+        return False
+
+    def cannot(self, state: State) -> bool:
+        """Check if the state is not valid from the current state
+
+        Args:
+            state : the targeted state
+
+        Returns:
+            True if the state is not a valid state from any of the current states
+        """
+        return not self.can(state)
@@ -13,9 +13,10 @@
 
 # ----- imports
 from __future__ import annotations
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
 from enum import Enum, auto
+from collections.abc import Mapping
 
 
 # ----- classes
@@ -41,6 +42,7 @@ class State:
         self.state_type = state_type
         self.enter_action = enter_action
         self.exit_action = exit_action
+        self.id = -1                    # id given by the FSM the state is added to
 
 class Event:
     """Definition of a FSM event"""
@@ -51,18 +53,87 @@ class Event:
             name : name of the event
         """
         self.name = name
+        self.id = -1                    # id given by the first FSM the event is added to
+
+class Guard:
+    """Definition of a FSM guard (condition on a transition)"""
+    def __init__(self, name: str, predicate: Callable[[Any], bool], keys: Optional[Sequence[str]] = None,
+                 batch_predicate: Optional[Callable[[List[Any]], List[bool]]] = None, cache_size: int = 1024) -> None:
+        """Constructor
+
+        Args:
+            name            : name of the guard
+            predicate       : a callable taking the context and returning True if the transition is allowed
+            keys            : the context keys (or attributes) the result depends on (enable the memoization)
+            batch_predicate : a callable taking a list of contexts and returning a list of results
+            cache_size      : maximum number of memoized results
+        """
+        self.name = name
+        self.predicate = predicate
+        self.keys = tuple(keys) if keys is not None else None
+        self.batch_predicate = batch_predicate
+        self.cache_size = cache_size
+        self.cache: Dict[tuple, bool] = { }
+
+    def check(self, context: Any) -> bool:
+        """Evaluate the guard for a context
+
+        Args:
+            context : the context given to the FSM update
+
+        Returns:
+            True if the transition is allowed
+        """
+        if self.keys is None:
+            return bool(self.predicate(context))
+
+        # the context can be a mapping or any object with attributes
+        if isinstance(context, Mapping):
+            key = tuple([context.get(name) for name in self.keys])
+        else:
+            key = tuple([getattr(context, name, None) for name in self.keys])
+
+        # a key with an unhashable value (e.g. a list) cannot be memoized
+        try:
+            result = self.cache.get(key)
+        except TypeError:
+            return bool(self.predicate(context))
+
+        if result is None:
+            result = bool(self.predicate(context))
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[key] = result
+
+        return result
+
+    def checkMany(self, contexts: List[Any]) -> List[bool]:
+        """Evaluate the guard for a list of contexts
+
+        Args:
+            contexts : the contexts to evaluate
+
+        Returns:
+            A list with the result for each context
+        """
+        if self.batch_predicate is not None:
+            return [bool(result) for result in self.batch_predicate(contexts)]
+
+        return [self.check(context) for context in contexts]
 
 class Transition:
     """Definition of a FSM transition"""
-    def __init__(self, event: Event, begin_state: State, end_state: State) -> None:
+    def __init__(self, event: Event, begin_state: State, end_state: State, guard: Optional[Guard] = None) -> None:
         """Constructor
 
         Args:
             event       : the event that will trigger the transition
             begin_state : the initial state of the transition
             end_state   : the final state of the transition
+            guard       : the condition to satisfy for the transition to occur
         """
         self.event = event
         self.begin_state = begin_state
         self.end_state = end_state
+        self.guard = guard
 
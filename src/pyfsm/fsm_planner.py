@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Shortest event sequences between FSM states
+
+# ----- imports
+from __future__ import annotations
+from typing import List, Optional, Tuple
+
+from array import array
+from collections import OrderedDict, deque
+
+from .fsm_objects import StateType, State
+from .fsm import FSM, FSMError, DecisionList
+from .fsm_nfa import NFSM
+
+
+# ----- globals
+END_TARGET = -1                 # cache key of the tree leading to any END state
+
+
+# ----- classes
+class Planner:
+    """Find the shortest event sequence leading to a state
+
+    For each target, a BFS tree is computed once on the reversed graph and
+    cached: it gives, for every state, the next event to send and the next
+    state on a shortest path. A query is then a walk in this table.
+    """
+
+    def __init__(self, fsm: FSM, cache_size: int = 256) -> None:
+        """Constructor
+
+        Args:
+            fsm        : a FSM with the definition to plan on (the definition must not change afterwards)
+            cache_size : the maximum number of BFS trees kept in memory
+        """
+        if isinstance(fsm, NFSM):
+            raise FSMError("Planning is not supported by the NFSM.")
+
+        if cache_size < 1:
+            raise FSMError("cache_size must be greater than 0.")
+
+        self.fsm = fsm
+        self.cache_size = cache_size
+        self.cache: OrderedDict[int, Tuple[array, array]] = OrderedDict()
+
+        self.names: List[str] = list(fsm.names)
+        self.event_names: List[str] = list(fsm.event_ids)
+
+        # reversed graph: state id -> list of (previous state id, event id)
+        # an END state cannot be left (the FSM ignores the events once ended)
+        self.reverse: List[List[Tuple[int, int]]] = [[ ] for _ in self.names]
+        for name, targets in fsm.states.items():
+            if targets['__object'].state_type == StateType.FSM_END_STATE:
+                continue
+
+            begin_id = fsm.ids[name]
+            for event, target in targets.items():
+                if event == '__object':
+                    continue
+
+                # every guarded choice is a possible move
+                states = target.states() if isinstance(target, DecisionList) else [target]
+                for state in states:
+                    if state is not None and state.name is not None:
+                        self.reverse[fsm.ids[state.name]].append((begin_id, fsm.event_ids[event]))
+
+        self.end_ids = [
+            fsm.ids[name] for name in self.names
+            if fsm.states[name]['__object'].state_type == StateType.FSM_END_STATE
+        ]
+
+    def _tree(self, key: int, targets: List[int]) -> Tuple[array, array]:
+        """Retrieve or compute the BFS tree leading to a set of states
+
+        Args:
+            key     : the cache key of the tree
+            targets : the ids of the target states
+
+        Returns:
+            The next event id and the next state id for each state
+            (-1 if unreachable, the state itself for a target)
+        """
+        tree = self.cache.get(key)
+        if tree is not None:
+            self.cache.move_to_end(key)
+            return tree
+
+        next_events = array('i', [-1]) * len(self.names)
+        next_states = array('i', [-1]) * len(self.names)
+        visited = bytearray(len(self.names))
+
+        queue = deque(targets)
+        for target in targets:
+            visited[target] = 1
+            next_states[target] = target
+
+        while queue:
+            state_id = queue.popleft()
+            for previous_id, event_id in self.reverse[state_id]:
+                if not visited[previous_id]:
+                    visited[previous_id] = 1
+                    next_events[previous_id] = event_id
+                    next_states[previous_id] = state_id
+                    queue.append(previous_id)
+
+        if len(self.cache) >= self.cache_size:
+            self.cache.popitem(last=False)
+
+        tree = (next_events, next_states)
+        self.cache[key] = tree
+        return tree
+
+    def _origin(self, origin: FSM | State | str) -> Optional[int]:
+        """Return the id of the origin state
+
+        Args:
+            origin : a FSM (its current state), a State or a state name
+
+        Returns:
+            The id of the state or None if the FSM has ended
+        """
+        if isinstance(origin, FSM):
+            if origin.current is None:
+                raise FSMError("FSM has no current state.")
+            if origin.has_ended:
+                return None
+            origin = origin.current.name
+        elif isinstance(origin, State):
+            origin = origin.name
+
+        if origin not in self.fsm.ids:
+            raise FSMError(f"Cannot find state {origin} in the FSM.")
+
+        return self.fsm.ids[origin]
+
+    def _walk(self, state_id: int, tree: Tuple[array, array]) -> Optional[List[str]]:
+        """Walk the BFS tree from a state
+
+        Args:
+            state_id : the id of the origin state
+            tree     : the BFS tree
+
+        Returns:
+            The list of event names or None if no target can be reached
+        """
+        next_events, next_states = tree
+        path = [ ]
+        while next_states[state_id] != state_id:
+            event_id = next_events[state_id]
+            if event_id < 0:
+                return None
+            path.append(self.event_names[event_id])
+            state_id = next_states[state_id]
+
+        return path
+
+    def path(self, origin: FSM | State | str, target: State | str) -> Optional[List[str]]:
+        """Find the shortest event sequence from a state to a target state
+
+        Args:
+            origin : a FSM (its current state), a State or a state name
+            target : a State or a state name
+
+        Returns:
+            The list of event names to send (empty if already on the target)
+            or None if unreachable or if the FSM has ended
+        """
+        target_name = target.name if isinstance(target, State) else target
+        if target_name not in self.fsm.ids:
+            raise FSMError(f"Cannot find state {target_name} in the FSM.")
+
+        origin_id = self._origin(origin)
+        if origin_id is None:
+            return None
+
+        target_id = self.fsm.ids[target_name]
+        return self._walk(origin_id, self._tree(target_id, [target_id]))
+
+    def pathToEnd(self, origin: FSM | State | str) -> Optional[List[str]]:
+        """Find the shortest event sequence from a state to any END state
+
+        Args:
+            origin : a FSM (its current state), a State or a state name
+
+        Returns:
+            The list of event names to send (empty if already on an END state)
+            or None if unreachable or if the FSM has ended
+        """
+        origin_id = self._origin(origin)
+        if origin_id is None:
+            return None
+
+        return self._walk(origin_id, self._tree(END_TARGET, self.end_ids))
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Pool of FSM instances with eviction to disk
+
+# ----- imports
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+import time
+import sqlite3
+
+from collections import OrderedDict
+
+from .fsm_objects import Event
+from .fsm import FSM, FSMError
+
+
+# ----- classes
+class FSMPool:
+    """Pool of FSM instances identified by a key
+
+    The most recently used instances are kept in memory. When the pool is
+    full, or when an instance has been idle for longer than the TTL, the
+    instance is evicted and its state (definition id, state id, ended flag)
+    is written to a local sqlite database. It is loaded back the next time
+    the key is used.
+    """
+
+    def __init__(self, fsm: FSM, filename: str, capacity: int = 10000,
+                 ttl: Optional[float] = None, definition: str = "default") -> None:
+        """Constructor
+
+        Args:
+            fsm        : the FSM used as a template (its definition is shared by all the instances)
+            filename   : the sqlite database used to store the evicted instances
+            capacity   : the maximum number of instances kept in memory
+            ttl        : the maximum idle time (in seconds) of an instance in memory (no limit if None)
+            definition : the id of the definition, checked when an instance is loaded
+        """
+        if capacity < 1:
+            raise FSMError("capacity must be greater than 0.")
+
+        self.template = fsm
+        self.capacity = capacity
+        self.ttl = ttl
+        self.definition = definition
+
+        self.instances: OrderedDict[str, Tuple[FSM, float]] = OrderedDict()
+
+        self.database = sqlite3.connect(filename)
+        self.closed = False
+        self.database.execute(
+            "CREATE TABLE IF NOT EXISTS instances ("
+            "key TEXT PRIMARY KEY, definition TEXT NOT NULL, state INTEGER NOT NULL, ended INTEGER NOT NULL)"
+        )
+        self.database.commit()
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.instances)
+
+    def get(self, key: str) -> FSM:
+        """Retrieve the FSM for a key
+
+        A new FSM is created (and started) if the key is unknown.
+        The FSM returned must not be kept: once the instance is evicted, it is
+        no longer updated by the pool and a later get() returns a new FSM.
+
+        Args:
+            key : the key of the instance
+
+        Returns:
+            The FSM instance
+        """
+        now = time.monotonic()
+        entry = self.instances.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.instances[key] = (entry[0], now)
+            self.instances.move_to_end(key)
+
+            # only the oldest instance is checked, the hit itself is never evicted
+            if self.ttl is not None:
+                self._evict(now)
+
+            return entry[0]
+
+        self.misses += 1
+        fsm = self.template.clone()
+
+        row = self.database.execute(
+            "SELECT definition, state, ended FROM instances WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            fsm.start()
+        else:
+            definition, state_id, ended = row
+            if definition != self.definition:
+                raise FSMError(f"Instance {key} was saved with the definition {definition}.")
+
+            fsm.restore(state_id, ended != 0)
+            self.database.execute("DELETE FROM instances WHERE key = ?", (key,))
+            self.loads += 1
+
+        self.instances[key] = (fsm, now)
+        self._evict(now)
+        return fsm
+
+    def update(self, key: str, event: Event, context: Any = None) -> None:
+        """Update the FSM of a key with the new event
+
+        Args:
+            key     : the key of the instance
+            event   : an event that will move the FSM
+            context : the context given to the guards of the transitions
+        """
+        self.get(key).update(event, context)
+
+    def _evict(self, now: float) -> None:
+        """Evict the instances above the capacity or idle for too long
+
+        Args:
+            now : the current monotonic time
+        """
+        rows = [ ]
+        while self.instances:
+            key, (fsm, last_access) = next(iter(self.instances.items()))
+            if len(self.instances) <= self.capacity and (self.ttl is None or now - last_access <= self.ttl):
+                break
+
+            self.instances.popitem(last=False)
+            rows.append(self._row(key, fsm))
+
+        self._write(rows)
+
+    def _row(self, key: str, fsm: FSM) -> Tuple[str, str, int, int]:
+        """Build the database row for an instance
+
+        Args:
+            key : the key of the instance
+            fsm : the FSM instance
+        """
+        return (key, self.definition, fsm.ids[fsm.current.name], 1 if fsm.has_ended else 0)
+
+    def _write(self, rows: List[Tuple[str, str, int, int]]) -> None:
+        """Write the evicted instances to the database
+
+        Args:
+            rows : the rows to write
+        """
+        if not rows:
+            return
+
+        self.database.executemany(
+            "INSERT OR REPLACE INTO instances (key, definition, state, ended) VALUES (?, ?, ?, ?)", rows
+        )
+        self.database.commit()
+        self.evictions += len(rows)
+
+    def expire(self) -> None:
+        """Evict the instances idle for longer than the TTL"""
+        self._evict(time.monotonic())
+
+    def evict(self, key: str) -> None:
+        """Evict an instance from the memory
+
+        Args:
+            key : the key of the instance
+        """
+        entry = self.instances.pop(key, None)
+        if entry is not None:
+            self._write([self._row(key, entry[0])])
+
+    def flush(self) -> None:
+        """Evict all the instances from the memory"""
+        rows = [self._row(key, fsm) for key, (fsm, _) in self.instances.items()]
+        self.instances.clear()
+        self._write(rows)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the counters of the pool
+
+        Returns:
+            A dictionary with the number of instances in memory, hits, misses, loads and evictions
+        """
+        return {
+            'instances': len(self.instances),
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'evictions': self.evictions,
+        }
+
+    def close(self) -> None:
+        """Write all the instances to the database and close it"""
+        if self.closed:
+            return
+
+        self.flush()
+        self.database.close()
+        self.closed = True
+
+    def __enter__(self) -> FSMPool:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
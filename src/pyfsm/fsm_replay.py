@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Replay of event logs through a FSM definition
+
+# ----- imports
+from __future__ import annotations
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import os
+import csv
+import json
+import time
+import queue
+import struct
+import itertools
+import multiprocessing
+
+from .fsm_objects import Event
+from .fsm import FSM, FSMError
+from .fsm_builder import FSMBuilder
+
+
+# ----- globals
+BINARY_RECORD = struct.Struct('<IH')        # instance key (uint32), event index (uint16)
+FORMATS = ('csv', 'jsonl', 'binary')
+POLL_INTERVAL = 0.5                         # seconds between two checks of the workers (--jobs)
+
+
+# ----- classes
+class ReplayReport:
+    """Result of a replay"""
+
+    def __init__(self) -> None:
+        """Constructor"""
+        self.events = 0                         # number of events given to the FSM (valid or not)
+        self.errors = 0                         # number of invalid transitions (FSMError)
+        self.unknown = 0                        # number of events not defined in the definition
+        self.bad = 0                            # number of records that cannot be decoded
+        self.states: Dict[str, int] = { }       # final state name -> number of instances
+        self.elapsed = 0.0                      # duration of the replay in seconds
+
+    @property
+    def instances(self) -> int:
+        """Return the number of instances replayed"""
+        return sum(self.states.values())
+
+    @property
+    def rate(self) -> float:
+        """Return the number of events replayed per second"""
+        return self.events / self.elapsed if self.elapsed > 0 else 0.0
+
+    def merge(self, other: ReplayReport) -> None:
+        """Add the counters of another report to this report
+
+        Args:
+            other : the report to merge
+        """
+        self.events += other.events
+        self.errors += other.errors
+        self.unknown += other.unknown
+        self.bad += other.bad
+        for name, count in other.states.items():
+            self.states[name] = self.states.get(name, 0) + count
+
+    def toDict(self) -> Dict[str, Any]:
+        """Return the report as a dictionary"""
+        return {
+            'events': self.events,
+            'errors': self.errors,
+            'unknown': self.unknown,
+            'bad': self.bad,
+            'instances': self.instances,
+            'elapsed': self.elapsed,
+            'rate': self.rate,
+            'states': self.states,
+        }
+
+
+class Replayer:
+    """Replay the events of a single partition"""
+
+    def __init__(self, definition: str) -> None:
+        """Constructor
+
+        Args:
+            definition : the YAML definition file
+        """
+        composite = FSMBuilder(definition).parse(event_objects=False)
+        self.template: FSM = composite.FSM
+        self.events: Dict[str, Event] = { name: Event(name) for name in composite.events }
+        self.instances: Dict[Hashable, FSM] = { }
+        self.report = ReplayReport()
+
+    def feed(self, records: List[Tuple[Hashable, str]]) -> None:
+        """Replay a chunk of records
+
+        Args:
+            records : a list of (instance key, event name)
+        """
+        instances = self.instances
+        events = self.events
+        report = self.report
+
+        for key, name in records:
+            event = events.get(name)
+            if event is None:
+                report.unknown += 1
+                continue
+
+            fsm = instances.get(key)
+            if fsm is None:
+                fsm = self.template.clone()
+                fsm.start()
+                instances[key] = fsm
+
+            report.events += 1
+            try:
+                fsm.update(event)
+            except FSMError:
+                report.errors += 1
+
+    def finish(self) -> ReplayReport:
+        """Compute the final states and return the report"""
+        for fsm in self.instances.values():
+            name = fsm.state()
+            self.report.states[name] = self.report.states.get(name, 0) + 1
+
+        return self.report
+
+
+class Replay:
+    """Stream an event log through a FSM definition"""
+
+    def __init__(self, definition: str, chunk_size: int = 65536, jobs: int = 1) -> None:
+        """Constructor
+
+        Args:
+            definition : the YAML definition file
+            chunk_size : the number of records read at once
+            jobs       : the number of processes (the records are partitioned by instance key)
+        """
+        if chunk_size < 1:
+            raise FSMError("chunk_size must be greater than 0.")
+        if jobs < 1:
+            raise FSMError("jobs must be greater than 0.")
+
+        self.definition = definition
+        self.chunk_size = chunk_size
+        self.jobs = jobs
+
+        # the events order is needed to decode the binary logs
+        self.event_names: List[str] = FSMBuilder(definition).parse(event_objects=False).events
+
+        self.bad = 0                            # records that cannot be decoded by the last read
+
+    def _readCsv(self, stream: Any, key_field: str, event_field: str) -> Iterator[Tuple[Hashable, str]]:
+        """Read (key, event) records from a CSV file (a single column means a single instance)"""
+        for line, row in enumerate(csv.reader(stream)):
+            if line == 0 and row in ([key_field, event_field], [event_field]):
+                # header row
+                continue
+
+            if len(row) == 1:
+                yield "", row[0]
+            elif len(row) > 1:
+                yield row[0], row[1]
+
+    def _readJson(self, stream: Any, key_field: str, event_field: str) -> Iterator[Tuple[Hashable, str]]:
+        """Read (key, event) records from a JSON lines file (malformed records are counted in self.bad)"""
+        for line in stream:
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+                key, event = record.get(key_field, ""), record[event_field]
+                hash(key)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.bad += 1
+                continue
+
+            if not isinstance(event, str):
+                self.bad += 1
+                continue
+
+            yield key, event
+
+    def _readBinary(self, stream: Any) -> Iterator[Tuple[Hashable, str]]:
+        """Read (key, event) records from a binary file made of BINARY_RECORD"""
+        names = self.event_names
+        size = BINARY_RECORD.size * 4096
+        while True:
+            data = stream.read(size)
+            if not data:
+                return
+            if len(data) % BINARY_RECORD.size:
+                # truncated record at the end of the file
+                self.bad += 1
+            for key, index in BINARY_RECORD.iter_unpack(data[:len(data) - len(data) % BINARY_RECORD.size]):
+                yield key, names[index] if index < len(names) else ""
+
+    def chunks(self, filename: str, fmt: Optional[str] = None,
+               key_field: str = "key", event_field: str = "event") -> Iterator[List[Tuple[Hashable, str]]]:
+        """Read an event log by chunks
+
+        Args:
+            filename    : the event log
+            fmt         : the format of the log (csv, jsonl, binary) or None to use the extension
+            key_field   : the name of the instance key field (JSON lines, CSV header)
+            event_field : the name of the event field (JSON lines, CSV header)
+
+        Returns:
+            An iterator on the chunks of (instance key, event name)
+        """
+        if fmt is None:
+            extension = os.path.splitext(filename)[1].lower()
+            fmt = {'.csv': 'csv', '.jsonl': 'jsonl', '.json': 'jsonl', '.bin': 'binary'}.get(extension)
+            if fmt is None:
+                raise FSMError(f"Cannot guess the format of {filename}.")
+
+        if fmt not in FORMATS:
+            raise FSMError(f"Unknown format <{fmt}>.")
+
+        self.bad = 0
+
+        stream: Any
+        if fmt == 'binary':
+            stream = open(filename, 'rb')
+            records = self._readBinary(stream)
+        else:
+            stream = open(filename, 'r', newline='')
+            if fmt == 'csv':
+                records = self._readCsv(stream, key_field, event_field)
+            else:
+                records = self._readJson(stream, key_field, event_field)
+
+        with stream:
+            while True:
+                chunk = list(itertools.islice(records, self.chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+
+    def run(self, filename: str, fmt: Optional[str] = None,
+            key_field: str = "key", event_field: str = "event") -> ReplayReport:
+        """Replay an event log
+
+        Args:
+            filename    : the event log
+            fmt         : the format of the log (csv, jsonl, binary) or None to use the extension
+            key_field   : the name of the instance key field (JSON lines, CSV header)
+            event_field : the name of the event field (JSON lines, CSV header)
+
+        Returns:
+            The report of the replay
+        """
+        start = time.perf_counter()
+        chunks = self.chunks(filename, fmt, key_field, event_field)
+
+        if self.jobs == 1:
+            replayer = Replayer(self.definition)
+            for chunk in chunks:
+                replayer.feed(chunk)
+            report = replayer.finish()
+
+        else:
+            report = self._runParallel(chunks)
+
+        report.bad += self.bad
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def _runParallel(self, chunks: Iterator[List[Tuple[Hashable, str]]]) -> ReplayReport:
+        """Replay the chunks on several processes, partitioned by instance key
+
+        Args:
+            chunks : the chunks of records
+
+        Returns:
+            The merged report
+        """
+        # bounded queues keep the memory used under control
+        inboxes: List[multiprocessing.Queue] = [multiprocessing.Queue(maxsize=4) for _ in range(self.jobs)]
+        outbox: multiprocessing.Queue = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(self.definition, inbox, outbox), daemon=True)
+            for inbox in inboxes
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            for chunk in chunks:
+                partitions: List[List[Tuple[Hashable, str]]] = [[ ] for _ in range(self.jobs)]
+                for record in chunk:
+                    partitions[hash(record[0]) % self.jobs].append(record)
+
+                for inbox, worker, partition in zip(inboxes, workers, partitions):
+                    if partition:
+                        self._put(inbox, worker, partition)
+
+            for inbox, worker in zip(inboxes, workers):
+                self._put(inbox, worker, None)
+
+            report = ReplayReport()
+            for _ in workers:
+                report.merge(self._get(outbox, workers))
+
+            for worker in workers:
+                worker.join()
+
+        finally:
+            # a worker died or the log cannot be read: stop the other workers
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        return report
+
+    def _put(self, inbox: multiprocessing.Queue, worker: multiprocessing.Process, item: Any) -> None:
+        """Send an item to a worker, checking that the worker is still running
+
+        Args:
+            inbox  : the queue of the worker
+            worker : the worker process
+            item   : the partition to send (None to stop the worker)
+        """
+        while True:
+            try:
+                inbox.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                if worker.exitcode is not None:
+                    raise FSMError(f"Replay worker {worker.pid} exited with code {worker.exitcode}.") from None
+
+    def _get(self, outbox: multiprocessing.Queue, workers: List[multiprocessing.Process]) -> ReplayReport:
+        """Wait for the report of a worker, checking that the workers are still running
+
+        Args:
+            outbox  : the queue receiving the reports
+            workers : the worker processes
+
+        Returns:
+            The report of one worker
+        """
+        while True:
+            try:
+                return outbox.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                for worker in workers:
+                    if worker.exitcode:
+                        raise FSMError(f"Replay worker {worker.pid} exited with code {worker.exitcode}.") from None
+
+
+# ----- functions
+def _worker(definition: str, inbox: multiprocessing.Queue, outbox: multiprocessing.Queue) -> None:
+    """Replay the partitions received until None is received
+
+    Args:
+        definition : the YAML definition file
+        inbox      : the queue of partitions
+        outbox     : the queue receiving the report
+    """
+    replayer = Replayer(definition)
+    while True:
+        records = inbox.get()
+        if records is None:
+            break
+        replayer.feed(records)
+
+    outbox.put(replayer.finish())
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Shared memory store for the FSM states
+
+# ----- imports
+from __future__ import annotations
+from typing import Any, List, Optional, Tuple
+
+import sys
+import time
+import zlib
+
+from multiprocessing import shared_memory
+
+from .fsm import FSM, FSMError
+
+
+# ----- globals
+STORE_MAGIC = 0x4653545354415445        # "FSTSTATE"
+HEADER_SIZE = 5                         # magic, number of slots, number of states, checksum, tracker pid
+SLOT_SIZE = 3                           # sequence, state id, ended flag
+ITEM_SIZE = 8                           # all the values are int64
+READ_SPINS = 64                         # busy retries of a read before yielding the CPU
+READ_RETRIES = 10000                    # retries of a read before giving up (the writer may have died)
+
+
+# ----- classes
+class StateStore:
+    """Current state of N FSM instances in shared memory
+
+    One process writes the states, any number of processes read them. Each
+    slot is protected by a seqlock: the writer makes the sequence odd while
+    updating the slot, the readers retry until they see the same even sequence
+    before and after reading the values.
+    """
+
+    def __init__(self, fsm: FSM, size: int, name: Optional[str] = None, create: bool = True) -> None:
+        """Constructor
+
+        Args:
+            fsm    : a FSM with the shared definition (used to map the ids to the names)
+            size   : the number of instances in the store (ignored when attaching)
+            name   : the name of the shared memory block (generated if None)
+            create : create the shared memory block or attach to an existing one
+        """
+        self.names: List[str] = list(fsm.names)
+        checksum = zlib.crc32("\n".join(self.names).encode('utf-8'))
+
+        if create:
+            if size < 1:
+                raise FSMError("size must be greater than 0.")
+
+            self.memory: Optional[shared_memory.SharedMemory] = shared_memory.SharedMemory(
+                name=name, create=True, size=(HEADER_SIZE + size * SLOT_SIZE) * ITEM_SIZE
+            )
+            self.buffer = self._map()
+            self.buffer[0] = STORE_MAGIC
+            self.buffer[1] = size
+            self.buffer[2] = len(self.names)
+            self.buffer[3] = checksum
+            self.buffer[4] = self._tracker()
+
+            # no state for all the slots
+            for index in range(size):
+                self.buffer[HEADER_SIZE + index * SLOT_SIZE + 1] = -1
+
+        else:
+            if name is None:
+                raise FSMError("Cannot attach to a store without a name.")
+
+            # the block belongs to its creator: a process with its own resource
+            # tracker must not track it, or the tracker would destroy it on exit
+            # (SharedMemory(track=False) is only available from Python 3.13)
+            if sys.version_info >= (3, 13):
+                self.memory = shared_memory.SharedMemory(name=name, create=False, track=False)
+            else:
+                self.memory = shared_memory.SharedMemory(name=name, create=False)
+
+            self.buffer = self._map()
+            if self.buffer[0] != STORE_MAGIC:
+                self.close()
+                raise FSMError(f"{name} is not a state store.")
+
+            if sys.version_info < (3, 13) and not self._sharesTracker(self.buffer[4]):
+                self._untrack()
+
+            if self.buffer[2] != len(self.names) or self.buffer[3] != checksum:
+                self.close()
+                raise FSMError(f"The store {name} was created with a different definition.")
+
+        self.name = self.memory.name
+        self.size = self.buffer[1]
+        self.owner = create
+
+    @classmethod
+    def attach(cls, name: str, fsm: FSM) -> StateStore:
+        """Attach to an existing store
+
+        Args:
+            name : the name of the shared memory block
+            fsm  : a FSM with the same definition as the writer
+
+        Returns:
+            The store mapped in this process
+        """
+        return cls(fsm, 0, name, create=False)
+
+    def _map(self) -> memoryview:
+        """Return the shared memory block as an array of int64"""
+        if self.memory is None or self.memory.buf is None:
+            raise FSMError("The store is closed.")
+
+        return self.memory.buf.cast('q')
+
+    # The three methods below are the fallback for Python < 3.13, where an
+    # attached block cannot be opened untracked. They rely on the private
+    # attributes of multiprocessing.resource_tracker and fail safe (no untrack)
+    # if those attributes change.
+    def _tracker(self) -> int:
+        """Return the pid of the resource tracker used by this process (0 if unknown)"""
+        try:
+            from multiprocessing import resource_tracker
+            return getattr(resource_tracker._resource_tracker, '_pid', None) or 0
+        except Exception:
+            return 0
+
+    def _sharesTracker(self, pid: int) -> bool:
+        """Check if this process uses the resource tracker of the creator
+
+        Args:
+            pid : the pid of the resource tracker of the creator
+        """
+        try:
+            from multiprocessing import resource_tracker
+            tracker = resource_tracker._resource_tracker
+            if getattr(tracker, '_pid') is None:
+                # the tracker is inherited from the parent process
+                return getattr(tracker, '_fd') is not None
+            return bool(getattr(tracker, '_pid') == pid)
+        except Exception:
+            return False
+
+    def _untrack(self) -> None:
+        """Prevent the resource tracker from destroying a block this process did not create"""
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(getattr(self.memory, '_name'), 'shared_memory')
+        except Exception:
+            pass
+
+    def _slot(self, index: int) -> int:
+        """Return the offset of a slot in the buffer
+
+        Args:
+            index : the index of the instance
+        """
+        if index < 0 or index >= self.size:
+            raise FSMError(f"Index {index} is out of range for the store.")
+
+        return HEADER_SIZE + index * SLOT_SIZE
+
+    def write(self, index: int, state_id: int, ended: bool) -> None:
+        """Write the state of an instance
+
+        Args:
+            index    : the index of the instance
+            state_id : the id of the current state
+            ended    : True if the FSM has ended
+        """
+        base = self._slot(index)
+        buffer = self.buffer
+        sequence = buffer[base]
+
+        buffer[base] = sequence + 1             # odd: write in progress
+        buffer[base + 1] = state_id
+        buffer[base + 2] = 1 if ended else 0
+        buffer[base] = sequence + 2             # even: slot is consistent
+
+    def bind(self, index: int, fsm: FSM) -> None:
+        """Publish the state of a FSM in a slot each time it moves
+
+        Args:
+            index : the index of the instance
+            fsm   : the FSM to publish
+        """
+        base = self._slot(index)
+
+        def _publish(fsm: FSM, event_id: int, from_id: int, to_id: int) -> None:
+            buffer = self.buffer
+            sequence = buffer[base]
+            buffer[base] = sequence + 1
+            buffer[base + 1] = to_id
+            buffer[base + 2] = 1 if fsm.has_ended else 0
+            buffer[base] = sequence + 2
+
+        fsm.observe(_publish)
+
+        if fsm.current is not None:
+            self.write(index, fsm.ids[fsm.current.name], fsm.has_ended)
+
+    def read(self, index: int) -> Tuple[int, bool]:
+        """Read a consistent snapshot of an instance
+
+        The read spins while the slot is being written, then yields the CPU,
+        and gives up after READ_RETRIES attempts (the writer may have died
+        in the middle of a write).
+
+        Args:
+            index : the index of the instance
+
+        Returns:
+            The id of the current state (-1 if none) and the ended flag
+        """
+        base = self._slot(index)
+        buffer = self.buffer
+
+        for attempt in range(READ_RETRIES):
+            sequence = buffer[base]
+            if not sequence & 1:
+                state_id = buffer[base + 1]
+                ended = buffer[base + 2]
+                if buffer[base] == sequence:
+                    return state_id, ended != 0
+
+            if attempt >= READ_SPINS:
+                time.sleep(0)
+
+        raise FSMError(f"Slot {index} of the store is locked by a write in progress.")
+
+    def state(self, index: int) -> str:
+        """Get the current state name of an instance
+
+        Args:
+            index : the index of the instance
+
+        Returns:
+            The name of the current state or the empty string
+        """
+        state_id, _ = self.read(index)
+        return self.names[state_id] if state_id >= 0 else ""
+
+    def has_ended(self, index: int) -> bool:
+        """Check if an instance has ended
+
+        Args:
+            index : the index of the instance
+
+        Returns:
+            True if the FSM has ended
+        """
+        return self.read(index)[1]
+
+    def close(self) -> None:
+        """Unmap the store from this process (and destroy it if this process created it)"""
+        memory = self.memory
+        if memory is None:
+            return
+
+        self.buffer.release()
+        memory.close()
+        if getattr(self, 'owner', False):
+            memory.unlink()
+        self.memory = None
+
+    def __enter__(self) -> StateStore:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
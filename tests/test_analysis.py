@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the graph analysis of FSM definitions
+
+# ----- imports
+from __future__ import annotations
+from typing import Any
+
+import os
+
+import pytest
+
+from pyfsm import FSM, FSMAnalyzer, FSMBuilder, FSMBuilderError, State, StateType, Event, Transition
+
+
+# ----- globals
+A, B = Event("a"), Event("b")
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "comradio-2.yml")
+END_EXIT = """
+Version: 1.0.0
+Events:
+  - a
+  - b
+States:
+  - name: B
+    type: BEGIN
+  - name: E
+    type: END
+  - name: Y
+Transitions:
+  - event: a
+    begin: B
+    end: E
+  - event: b
+    begin: E
+    end: Y
+  - event: a
+    begin: Y
+    end: E
+"""
+
+
+# ----- functions
+def test_end_exit_is_ignored() -> None:
+    # B -a-> E (END), E -b-> Y, Y -a-> E: Y can never be reached
+    begin = State("B", StateType.FSM_BEGIN_STATE)
+    end = State("E", StateType.FSM_END_STATE)
+    y = State("Y", StateType.FSM_NORMAL_STATE)
+    fsm = FSM()
+    fsm.add([Transition(A, begin, end), Transition(B, end, y), Transition(A, y, end)])
+
+    report = FSMAnalyzer(fsm).run()
+    assert report.unreachable == ["Y"]
+    assert report.dead_ends == [ ]
+    assert len(report.issues()) == 1
+
+
+def test_dead_ends_and_traps() -> None:
+    # B -a-> X, X -a-> Z, Z -b-> X, B -b-> E (END): X and Z form a trap
+    begin = State("B", StateType.FSM_BEGIN_STATE)
+    x = State("X", StateType.FSM_NORMAL_STATE)
+    z = State("Z", StateType.FSM_NORMAL_STATE)
+    end = State("E", StateType.FSM_END_STATE)
+    fsm = FSM()
+    fsm.add([Transition(A, begin, x), Transition(A, x, z), Transition(B, z, x), Transition(B, begin, end)])
+
+    report = FSMAnalyzer(fsm).run()
+    assert report.unreachable == [ ]
+    assert sorted(report.dead_ends) == ["X", "Z"]
+    assert [sorted(trap) for trap in report.traps] == [["X", "Z"]]
+
+
+def test_strict_parse(tmp_path: Any) -> None:
+    FSMBuilder(EXAMPLE).parse(strict=True)
+
+    filename = tmp_path / "end_exit.yml"
+    filename.write_text(END_EXIT)
+    FSMBuilder(str(filename)).parse()
+    with pytest.raises(FSMBuilderError):
+        FSMBuilder(str(filename)).parse(strict=True)
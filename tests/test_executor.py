@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the parallel execution of the user actions
+
+# ----- imports
+from __future__ import annotations
+
+import time
+import random
+
+from pyfsm import FSM, ActionExecutor, State, StateType, Event, Transition
+
+
+# ----- globals
+PING, PONG = Event("ping"), Event("pong")
+
+
+# ----- functions
+def _build() -> FSM:
+    """Build a FSM with an action on each move"""
+    a = State("A", StateType.FSM_BEGIN_STATE, enter_action="enter A")
+    b = State("B", StateType.FSM_NORMAL_STATE, enter_action="enter B")
+
+    fsm = FSM()
+    fsm.add([Transition(PING, a, b), Transition(PONG, b, a)])
+    return fsm
+
+
+def test_order_per_fsm() -> None:
+    def _action(action: str) -> str:
+        # random delays: only the order within a FSM is guaranteed
+        time.sleep(random.random() / 1000)
+        return action
+
+    executor = ActionExecutor(workers=4)
+    template = _build()
+    instances = [template.clone() for _ in range(8)]
+    for instance in instances:
+        executor.attach(instance, _action)
+        instance.start()
+        for _ in range(10):
+            instance.update(PING)
+            instance.update(PONG)
+
+    assert executor.join(timeout=10)
+    results = executor.results()
+    executor.shutdown()
+
+    assert len(results) == 8 * 20
+    for instance in instances:
+        actions = [result.action for result in results if result.fsm is instance]
+        assert actions == ["enter B", "enter A"] * 10
+
+
+def test_shutdown_drains_the_lanes() -> None:
+    def _slow(action: str) -> str:
+        time.sleep(0.01)
+        return action
+
+    executor = ActionExecutor(workers=1)
+    fsm = _build()
+    executor.attach(fsm, _slow)
+    fsm.start()
+    for _ in range(5):
+        fsm.update(PING)
+        fsm.update(PONG)
+
+    executor.shutdown(wait=True)
+    stats = executor.stats()
+    assert stats['pending'] == 0
+    assert stats['executed'] == 10
+    assert stats['failed'] == 0
+
+
+def test_actions_after_shutdown_fail() -> None:
+    executor = ActionExecutor(workers=1)
+    fsm = _build()
+    executor.attach(fsm, lambda action: action)
+    fsm.start()
+    executor.shutdown()
+
+    fsm.update(PING)
+    assert executor.join(timeout=1)
+    results = executor.results()
+    assert len(results) == 1
+    assert isinstance(results[0].error, RuntimeError)
+    assert executor.stats()['pending'] == 0
+
+
+def test_errors_are_reported() -> None:
+    def _fail(action: str) -> None:
+        raise ValueError(action)
+
+    with ActionExecutor(workers=2) as executor:
+        fsm = _build()
+        executor.attach(fsm, _fail)
+        fsm.start()
+        fsm.update(PING)
+        results = executor.results(timeout=5)
+
+    assert isinstance(results[0].error, ValueError)
+    assert results[0].fsm is fsm
+
+
+def test_clone_gets_its_own_queue() -> None:
+    with ActionExecutor(workers=2) as executor:
+        template = _build()
+        executor.attach(template, lambda action: action)
+        clone = template.clone()
+        assert clone.user_queue is not template.user_queue
+
+        clone.start()
+        clone.update(PING)
+        assert executor.join(timeout=5)
+        assert [result.fsm for result in executor.results()] == [clone]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the guarded transitions
+
+# ----- imports
+from __future__ import annotations
+from typing import Any, List
+
+import pytest
+
+from pyfsm import FSM, NFSM, FSMError, DecisionList, Guard, State, StateType, Event, Transition
+
+
+# ----- globals
+GO = Event("go")
+
+
+# ----- functions
+def _build(guards: List[Any]) -> FSM:
+    """Build a FSM with one guarded choice per (guard, target name)"""
+    begin = State("B", StateType.FSM_BEGIN_STATE)
+    states = {name: State(name, StateType.FSM_NORMAL_STATE) for name in ("LOW", "HIGH", "OTHER")}
+
+    fsm = FSM()
+    fsm.add([Transition(GO, begin, states[name], guard) for guard, name in guards])
+    return fsm
+
+
+def test_declared_order() -> None:
+    low = Guard("low", lambda context: context["v"] < 10)
+    high = Guard("high", lambda context: context["v"] < 100)
+    fsm = _build([(low, "LOW"), (high, "HIGH"), (None, "OTHER")])
+    assert isinstance(fsm.states["B"]["go"], DecisionList)
+
+    for value, expected in ((5, "LOW"), (50, "HIGH"), (500, "OTHER")):
+        fsm.start()
+        fsm.update(GO, {"v": value})
+        assert fsm.state() == expected
+
+
+def test_no_guard_satisfied() -> None:
+    fsm = _build([(Guard("never", lambda context: False), "LOW")])
+    fsm.start()
+    with pytest.raises(FSMError):
+        fsm.update(GO, { })
+    assert fsm.state() == "B"
+
+
+def test_shadowed_choice() -> None:
+    with pytest.raises(FSMError):
+        _build([(None, "OTHER"), (Guard("low", lambda context: True), "LOW")])
+
+
+def test_memoization() -> None:
+    calls: List[Any] = [ ]
+
+    def _low(context: Any) -> bool:
+        calls.append(context)
+        return bool(context["v"] < 10)
+
+    fsm = _build([(Guard("low", _low, keys=["v"]), "LOW"), (None, "OTHER")])
+    for _ in range(3):
+        fsm.start()
+        fsm.update(GO, {"v": 1, "ignored": object()})
+    assert len(calls) == 1
+
+
+def test_non_mapping_and_unhashable_contexts() -> None:
+    class Context:
+        v = 1
+
+    def _value(context: Any) -> bool:
+        return bool(context["v"] if isinstance(context, dict) else context.v)
+
+    guard = Guard("value", _value, keys=["v"])
+    fsm = _build([(guard, "LOW"), (None, "OTHER")])
+
+    fsm.start()
+    fsm.update(GO, Context())
+    assert fsm.state() == "LOW"
+
+    # a list cannot be a memoization key: the predicate is called directly
+    fsm.start()
+    fsm.update(GO, {"v": [1]})
+    assert fsm.state() == "LOW"
+
+
+def test_update_batch() -> None:
+    low = Guard("low", lambda context: context < 10, batch_predicate=lambda contexts: [c < 10 for c in contexts])
+    fsm = _build([(low, "LOW"), (None, "OTHER")])
+    instances = [fsm.clone() for _ in range(3)]
+    for instance in instances:
+        instance.start()
+
+    errors = FSM.updateBatch(instances, GO, [1, 20, 3])
+    assert errors == [None, None, None]
+    assert [instance.state() for instance in instances] == ["LOW", "OTHER", "LOW"]
+
+
+def test_update_batch_nfsm() -> None:
+    x = State("X", StateType.FSM_NORMAL_STATE)
+    y = State("Y", StateType.FSM_NORMAL_STATE)
+    z = State("Z", StateType.FSM_NORMAL_STATE)
+    nfsm = NFSM()
+    begin = State("B", StateType.FSM_BEGIN_STATE)
+    nfsm.add([Transition(GO, begin, x), Transition(GO, begin, y), Transition(Event("b"), x, z)])
+    nfsm.start()
+    nfsm.update(GO)
+
+    errors = FSM.updateBatch([nfsm], Event("b"), [None])
+    assert errors == [None]
+    assert nfsm.state() == "Z"
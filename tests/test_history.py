@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the transition history and the trace recorder
+
+# ----- imports
+from __future__ import annotations
+from typing import Any, List
+
+import pytest
+
+from pyfsm import FSM, FSMError, History, TraceRecorder, State, StateType, Event, Transition
+
+
+# ----- globals
+PING, PONG = Event("ping"), Event("pong")
+
+
+# ----- functions
+def _build() -> FSM:
+    """Build a FSM moving between A and B"""
+    a = State("A", StateType.FSM_BEGIN_STATE)
+    b = State("B", StateType.FSM_NORMAL_STATE)
+
+    fsm = FSM()
+    fsm.add([Transition(PING, a, b), Transition(PONG, b, a)])
+    return fsm
+
+
+def test_history_wraps_around() -> None:
+    fsm = _build()
+    history = History(fsm, size=3)
+    fsm.start()
+    for _ in range(3):
+        fsm.update(PING)
+        fsm.update(PONG)
+
+    entries = history.entries()
+    assert len(history) == 3
+    assert [entry[:3] for entry in entries] == [("pong", "B", "A"), ("ping", "A", "B"), ("pong", "B", "A")]
+    assert [entry[3] for entry in entries] == sorted(entry[3] for entry in entries)
+
+
+def test_history_start_and_detach() -> None:
+    fsm = _build()
+    history = History(fsm, size=8)
+    fsm.start()
+    assert history.entries()[0][:3] == ("", "", "A")
+
+    history.detach()
+    fsm.update(PING)
+    assert len(history) == 1
+
+
+def test_trace_round_trip(tmp_path: Any) -> None:
+    filename = str(tmp_path / "trace.bin")
+    first, second = _build(), _build().clone()
+
+    with TraceRecorder(filename, chunk_size=2) as recorder:
+        assert recorder.attach(first) == 0
+        assert recorder.attach(second) == 1
+        first.start()
+        second.start()
+        first.update(PING)
+        second.update(PING)
+        second.update(PONG)
+
+    rows: List[Any] = [ ]
+    for chunk in TraceRecorder.read(filename):
+        rows.extend(zip(*chunk[:4]))
+
+    # start() is recorded with -1 as event and from state
+    assert rows == [(0, -1, -1, 0), (1, -1, -1, 0), (0, 0, 0, 1), (1, 0, 0, 1), (1, 1, 1, 0)]
+
+
+def test_closed_trace_detaches(tmp_path: Any) -> None:
+    fsm = _build()
+    recorder = TraceRecorder(str(tmp_path / "trace.bin"))
+    recorder.attach(fsm)
+    recorder.close()
+
+    fsm.start()
+    fsm.update(PING)
+    assert fsm.state() == "B"
+    assert fsm.recorder is None
+
+    with pytest.raises(FSMError):
+        recorder.attach(fsm)
+
+
+def test_shared_event_ids() -> None:
+    # the same event objects added in another order to another FSM
+    _build()
+    a = State("A", StateType.FSM_BEGIN_STATE)
+    b = State("B", StateType.FSM_NORMAL_STATE)
+    other = FSM()
+    other.add([Transition(PONG, a, b), Transition(PING, b, a)])
+    history = History(other)
+    other.start()
+    other.update(PONG)
+    assert history.entries()[-1][:3] == ("pong", "A", "B")
+
+
+def test_state_in_two_definitions() -> None:
+    a = State("A", StateType.FSM_BEGIN_STATE)
+    b = State("B", StateType.FSM_NORMAL_STATE)
+    FSM().add([Transition(PING, a, b)])
+
+    with pytest.raises(FSMError):
+        FSM().add([Transition(PONG, b, a)])
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Cost of "import pyfsm"
+
+# ----- imports
+from __future__ import annotations
+from typing import Dict
+
+import os
+import sys
+import subprocess
+
+
+# ----- globals
+SOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+HEAVY_MODULES = ('yaml', 'sqlite3', 'multiprocessing', 'concurrent.futures')
+MAX_IMPORT_TIME = 1_000_000     # loose bound (in us) on the cumulative import time of pyfsm
+
+
+# ----- functions
+def _importTimes(code: str) -> Dict[str, int]:
+    """Run some code in a new interpreter with -X importtime
+
+    Args:
+        code : the code to run
+
+    Returns:
+        The cumulative import time (in us) of each module imported
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SOURCES, env.get('PYTHONPATH')]))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, capture_output=True, text=True, check=True
+    )
+
+    # import time: self [us] | cumulative | imported package
+    times = { }
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_import_is_light() -> None:
+    times = _importTimes("import pyfsm")
+
+    assert 'pyfsm' in times
+    for module in HEAVY_MODULES:
+        assert module not in times, f"{module} is imported by 'import pyfsm'"
+    assert times['pyfsm'] < MAX_IMPORT_TIME
+
+
+def test_lazy_names() -> None:
+    times = _importTimes("from pyfsm import *; Replayer, FSMPool")
+
+    assert 'sqlite3' in times
+    assert 'yaml' in times
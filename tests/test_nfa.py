@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the nondeterministic FSM
+
+# ----- imports
+from __future__ import annotations
+from typing import List
+
+import queue
+
+import pytest
+
+from pyfsm import NFSM, FSMError, EPSILON, State, StateType, Event, Transition
+
+
+# ----- functions
+def _build(cache_size: int = 16) -> NFSM:
+    """Build the NFSM used by the tests
+
+    B -a-> X, B -a-> Y, X -b-> Z, Y -b-> E (END), Y -eps-> W, W -c-> E
+    """
+    begin = State("B", StateType.FSM_BEGIN_STATE)
+    x = State("X", StateType.FSM_NORMAL_STATE, enter_action="enter X")
+    y = State("Y", StateType.FSM_NORMAL_STATE, enter_action="enter Y")
+    z = State("Z", StateType.FSM_NORMAL_STATE)
+    w = State("W", StateType.FSM_NORMAL_STATE)
+    end = State("E", StateType.FSM_END_STATE)
+    a, b, c, eps = Event("a"), Event("b"), Event("c"), Event(EPSILON)
+
+    fsm = NFSM(cache_size=cache_size)
+    fsm.add([
+        Transition(a, begin, x),
+        Transition(a, begin, y),
+        Transition(b, x, z),
+        Transition(b, y, end),
+        Transition(eps, y, w),
+        Transition(c, w, end),
+    ])
+    return fsm
+
+
+def test_subset_construction() -> None:
+    fsm = _build()
+    fsm.start()
+    assert fsm.state() == "B"
+
+    fsm.update(Event("a"))
+    assert fsm.current.members == frozenset(["X", "Y", "W"])
+    assert fsm.state() == "{X,Y,W}"
+    assert not fsm.has_ended
+
+    fsm.update(Event("b"))
+    assert fsm.current.members == frozenset(["Z", "E"])
+    assert fsm.has_ended
+
+
+def test_epsilon_closure() -> None:
+    fsm = _build()
+    fsm.start()
+    fsm.update(Event("a"))
+
+    # c is only accepted by W, reached from Y through an epsilon move
+    fsm.update(Event("c"))
+    assert fsm.state() == "E"
+    assert fsm.has_ended
+
+
+def test_undefined_event() -> None:
+    fsm = _build()
+    fsm.start()
+    with pytest.raises(FSMError):
+        fsm.update(Event("c"))
+
+
+def test_moves_after_eviction() -> None:
+    fsm = _build(cache_size=1)
+    expected: List[str] = [ ]
+    for _ in range(3):
+        fsm.start()
+        fsm.update(Event("a"))
+        expected.append(fsm.state())
+        fsm.update(Event("b"))
+        expected.append(fsm.state())
+
+        # only the current DFA state stays in the cache
+        assert len(fsm.cache) == 1
+
+    assert expected == ["{X,Y,W}", "{Z,E}"] * 3
+
+
+def test_actions_in_definition_order() -> None:
+    actions: "queue.Queue" = queue.Queue()
+    fsm = _build()
+    fsm.setup(lambda action: action, actions)
+    fsm.start()
+    fsm.update(Event("a"))
+
+    assert [actions.get_nowait()() for _ in range(actions.qsize())] == ["enter X", "enter Y"]
+
+
+def test_unsupported_features() -> None:
+    fsm = _build()
+    with pytest.raises(FSMError):
+        fsm.observe(lambda *args: None)
+    with pytest.raises(FSMError):
+        fsm.restore(0, False)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the shortest event paths
+
+# ----- imports
+from __future__ import annotations
+
+import pytest
+
+from pyfsm import FSM, NFSM, FSMError, Planner, State, StateType, Event, Transition
+
+
+# ----- globals
+A, B, C = Event("a"), Event("b"), Event("c")
+
+
+# ----- functions
+def _build() -> FSM:
+    """B -a-> E (END), E -b-> Y, B -c-> X, X -a-> Y"""
+    begin = State("B", StateType.FSM_BEGIN_STATE)
+    end = State("E", StateType.FSM_END_STATE)
+    x = State("X", StateType.FSM_NORMAL_STATE)
+    y = State("Y", StateType.FSM_NORMAL_STATE)
+
+    fsm = FSM()
+    fsm.add([Transition(A, begin, end), Transition(B, end, y), Transition(C, begin, x), Transition(A, x, y)])
+    return fsm
+
+
+def test_path_avoids_end_states() -> None:
+    fsm = _build()
+    fsm.start()
+    planner = Planner(fsm)
+
+    assert planner.path(fsm, "Y") == ["c", "a"]
+    assert planner.path("E", "Y") is None
+    assert planner.path("Y", "Y") == [ ]
+    assert planner.path("Y", "B") is None
+
+
+def test_path_to_end() -> None:
+    fsm = _build()
+    fsm.start()
+    planner = Planner(fsm)
+
+    assert planner.pathToEnd(fsm) == ["a"]
+    assert planner.pathToEnd("E") == [ ]
+    assert planner.pathToEnd("X") is None
+
+
+def test_ended_fsm() -> None:
+    fsm = _build()
+    fsm.start()
+    planner = Planner(fsm)
+    fsm.update(A)
+
+    assert fsm.has_ended
+    assert planner.path(fsm, "Y") is None
+    assert planner.pathToEnd(fsm) is None
+
+
+def test_errors() -> None:
+    fsm = _build()
+    planner = Planner(fsm)
+
+    with pytest.raises(FSMError):
+        planner.path(fsm, "Y")              # not started
+    with pytest.raises(FSMError):
+        planner.path("B", "Z")
+    with pytest.raises(FSMError):
+        Planner(NFSM())
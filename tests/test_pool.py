@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the pool of FSM instances
+
+# ----- imports
+from __future__ import annotations
+from typing import Any
+
+import time
+
+import pytest
+
+from pyfsm import FSM, FSMError, FSMPool, State, StateType, Event, Transition
+
+
+# ----- globals
+PING, PONG = Event("ping"), Event("pong")
+
+
+# ----- functions
+def _build() -> FSM:
+    """Build a FSM moving between A and B"""
+    a = State("A", StateType.FSM_BEGIN_STATE)
+    b = State("B", StateType.FSM_NORMAL_STATE)
+
+    fsm = FSM()
+    fsm.add([Transition(PING, a, b), Transition(PONG, b, a)])
+    return fsm
+
+
+def test_lru_eviction_and_reload(tmp_path: Any) -> None:
+    with FSMPool(_build(), str(tmp_path / "pool.db"), capacity=2) as pool:
+        pool.update("first", PING)
+        pool.get("second")
+        pool.get("first")
+        pool.get("third")           # evicts "second", the least recently used
+
+        assert len(pool) == 2
+        assert "second" not in pool.instances
+        assert pool.stats()['evictions'] == 1
+
+        pool.get("second")          # evicts "first" in state B
+        assert pool.get("first").state() == "B"
+        assert pool.stats()['loads'] == 2
+
+
+def test_ttl_eviction_on_hits(tmp_path: Any) -> None:
+    with FSMPool(_build(), str(tmp_path / "pool.db"), capacity=10, ttl=0.05) as pool:
+        pool.get("idle")
+        pool.get("busy")
+        time.sleep(0.1)
+        pool.get("busy")
+
+        assert list(pool.instances) == ["busy"]
+
+
+def test_reload_after_close(tmp_path: Any) -> None:
+    filename = str(tmp_path / "pool.db")
+    with FSMPool(_build(), filename) as pool:
+        pool.update("key", PING)
+
+    with FSMPool(_build(), filename) as pool:
+        assert pool.get("key").state() == "B"
+        assert pool.stats()['loads'] == 1
+
+
+def test_other_definition(tmp_path: Any) -> None:
+    filename = str(tmp_path / "pool.db")
+    with FSMPool(_build(), filename, definition="v1") as pool:
+        pool.get("key")
+
+    with FSMPool(_build(), filename, definition="v2") as pool:
+        with pytest.raises(FSMError):
+            pool.get("key")
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the replay of event logs
+
+# ----- imports
+from __future__ import annotations
+from typing import Any
+
+import os
+import shutil
+
+import pytest
+
+from pyfsm import FSMError, Replay
+from pyfsm.fsm_replay import BINARY_RECORD
+
+
+# ----- globals
+DEFINITION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "comradio-2.yml")
+
+
+# ----- functions
+def _write(path: Any, content: str) -> str:
+    """Write a text file and return its name"""
+    path.write_text(content)
+    return str(path)
+
+
+def test_csv(tmp_path: Any) -> None:
+    filename = _write(tmp_path / "events.csv", "key,event\na,E.ON\nb,E.ON\na,E.READY\nb,E.NOPE\nb,E.SWAP\n")
+    report = Replay(DEFINITION).run(filename)
+
+    assert report.events == 4
+    assert report.unknown == 1
+    assert report.errors == 1             # E.SWAP is not defined for S.ON
+    assert report.bad == 0
+    assert report.states == {"S.READY": 1, "S.ON": 1}
+
+
+def test_only_unknown_events(tmp_path: Any) -> None:
+    filename = _write(tmp_path / "events.csv", "a,E.NOPE\n" * 100)
+    report = Replay(DEFINITION).run(filename)
+
+    assert report.events == 0
+    assert report.unknown == 100
+    assert report.rate == 0.0
+    assert report.instances == 0
+
+
+def test_jsonl_bad_records(tmp_path: Any) -> None:
+    filename = _write(tmp_path / "events.jsonl", "\n".join([
+        '{"id": "a", "name": "E.ON"}',
+        'not json',
+        '{"id": "a"}',
+        '[1, 2]',
+        '{"id": [1], "name": "E.ON"}',
+        '{"id": "b", "name": 3}',
+        '{"id": "a", "name": "E.READY"}',
+    ]) + "\n")
+    report = Replay(DEFINITION).run(filename, key_field="id", event_field="name")
+
+    assert report.events == 2
+    assert report.bad == 5
+    assert report.states == {"S.READY": 1}
+
+
+def test_binary(tmp_path: Any) -> None:
+    records = [(7, 1), (7, 3), (8, 1), (8, 99)]
+    data = b"".join(BINARY_RECORD.pack(key, index) for key, index in records) + b"\x01"
+    filename = str(tmp_path / "events.bin")
+    with open(filename, "wb") as stream:
+        stream.write(data)
+
+    report = Replay(DEFINITION, chunk_size=2).run(filename)
+    assert report.events == 3
+    assert report.unknown == 1
+    assert report.bad == 1                  # truncated record at the end
+    assert report.states == {"S.READY": 1, "S.ON": 1}
+
+
+def test_parallel(tmp_path: Any) -> None:
+    lines = [f"{key},E.ON\n{key},E.READY\n" for key in range(50)]
+    filename = _write(tmp_path / "events.csv", "".join(lines))
+    report = Replay(DEFINITION, chunk_size=16, jobs=2).run(filename)
+
+    assert report.events == 100
+    assert report.states == {"S.READY": 50}
+
+
+def test_dead_worker(tmp_path: Any) -> None:
+    # the workers cannot load a definition removed after the replay is created
+    definition = str(tmp_path / "definition.yml")
+    shutil.copy(DEFINITION, definition)
+    replay = Replay(definition, jobs=2)
+    os.remove(definition)
+
+    filename = _write(tmp_path / "events.csv", "a,E.ON\n")
+    with pytest.raises(FSMError):
+        replay.run(filename)
+
+
+def test_unknown_format(tmp_path: Any) -> None:
+    with pytest.raises(FSMError):
+        Replay(DEFINITION).run(_write(tmp_path / "events.txt", "a,E.ON\n"))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# vim: filetype=python
+#
+# This source file is subject to the Apache License 2.0
+# that is bundled with this package in the file LICENSE.txt.
+# It is also available through the Internet at this address:
+# https://opensource.org/licenses/Apache-2.0
+#
+# @author	Sebastien LEGRAND
+# @license	Apache License 2.0
+#
+# @brief	Tests of the shared memory store
+
+# ----- imports
+from __future__ import annotations
+
+import pytest
+
+from pyfsm import FSM, FSMError, StateStore, State, StateType, Event, Transition
+from pyfsm import fsm_store
+
+
+# ----- globals
+PING, PONG = Event("ping"), Event("pong")
+
+
+# ----- functions
+def _build(*names: str) -> FSM:
+    """Build a FSM moving from the first state to the next ones and back"""
+    states = [State(names[0], StateType.FSM_BEGIN_STATE)]
+    states += [State(name, StateType.FSM_NORMAL_STATE) for name in names[1:]]
+
+    fsm = FSM()
+    for begin, end in zip(states, states[1:] + states[:1]):
+        fsm.add(Transition(PING if end is not states[0] else PONG, begin, end))
+    return fsm
+
+
+def test_attach_and_publish() -> None:
+    fsm = _build("A", "B")
+    with StateStore(fsm, 4) as store:
+        store.bind(1, fsm)
+        fsm.start()
+
+        with StateStore.attach(store.name, _build("A", "B")) as reader:
+            assert reader.size == 4
+            assert reader.state(0) == ""
+            assert reader.state(1) == "A"
+
+            fsm.update(PING)
+            assert reader.read(1) == (1, False)
+            assert reader.state(1) == "B"
+            assert not reader.has_ended(1)
+
+
+def test_checksum_mismatch() -> None:
+    fsm = _build("A", "B")
+    with StateStore(fsm, 2) as store:
+        with pytest.raises(FSMError):
+            StateStore.attach(store.name, _build("A", "C"))
+
+
+def test_out_of_range() -> None:
+    fsm = _build("A", "B")
+    with StateStore(fsm, 2) as store:
+        with pytest.raises(FSMError):
+            store.write(2, 0, False)
+
+
+def test_locked_slot(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fsm_store, "READ_RETRIES", 200)
+
+    fsm = _build("A", "B")
+    with StateStore(fsm, 2) as store:
+        # a writer died in the middle of a write: the sequence stays odd
+        store.buffer[fsm_store.HEADER_SIZE] = 1
+        with pytest.raises(FSMError):
+            store.read(0)
+
+        store.buffer[fsm_store.HEADER_SIZE] = 2
+        assert store.read(0) == (-1, False)